@@ -3,13 +3,15 @@ from sys import argv
 from argparse import ArgumentParser
 from serial.tools.list_ports import comports
 
+from demo.image import GreyscaleDemo, ImageDemo
 from demo.life import LifeDemo
 from demo.lyrics import LyricsDemo
 from demo.autolyrics import AutoLyricsDemo
-from demo.text import ClockDemo, TextDemo, MultiTextDemo
-from demo.train import TrainDemo
+from demo.text import ClockDemo, TextDemo, MarqueeDemo, MultiTextDemo
+from demo.train import DashboardDemo, TrainDemo
 from flippy.comms import SerialComms
 from flippy.sign import Sign
+from flippy.transforms import Mounting
 
 
 def list_ports(include_mock: bool = False):
@@ -35,6 +37,12 @@ def run_demo():
     parser.add_argument("width", help="width of your screen")
     parser.add_argument("height", help="height of your screen")
     parser.add_argument("--address", default=0, help="display address")
+    parser.add_argument(
+        "--mounting",
+        default=Mounting.NORMAL.name,
+        choices=[mounting.name for mounting in Mounting],
+        help="how the sign is mounted",
+    )
     parser.add_argument("-v", "--verbose", default=False, action="store_true")
     args = parser.parse_args()
 
@@ -44,16 +52,24 @@ def run_demo():
         logging.basicConfig(level=logging.INFO)
 
     comms = SerialComms(port=args.port, address=args.address)
-    sign = Sign(shape=(int(args.width), int(args.height)), comms=comms)
+    sign = Sign(
+        shape=(int(args.width), int(args.height)),
+        comms=comms,
+        mounting=Mounting[args.mounting],
+    )
 
     demos = [
         TextDemo,
         ClockDemo,
         MultiTextDemo,
+        MarqueeDemo,
         LifeDemo,
+        ImageDemo,
+        GreyscaleDemo,
         LyricsDemo,
         AutoLyricsDemo,
         TrainDemo,
+        DashboardDemo,
     ]
     print("Demos Available:")
     for i, demo in enumerate(demos):
@@ -1,26 +1,39 @@
+import functools
+import heapq
+import itertools
+import math
+import os
 import re
-from time import sleep, monotonic
-from typing import Optional
+import selectors
+import sys
+from time import monotonic
+from typing import Callable, Optional
 from argparse import ArgumentParser
-from threading import Thread
+from threading import Lock, Thread
 from dataclasses import dataclass
+from collections import OrderedDict
+from concurrent import futures
 
 import spotipy
 import numpy as np
 from dotenv import load_dotenv
+from requests import RequestException
 from spotipy.oauth2 import SpotifyOAuth
 
 from demo.lyrics import LyricsDemo
 
 from flippy.sign import Sign
 from flippy.comms import SerialComms
-from flippy.text_rendering import MINECRAFT, TextRenderer
+from flippy.text_rendering import MINECRAFT, FontStack, TextRenderer
+from flippy.transitions import frame_at, next_change
 
-from utils.lyrics_gui import LyricsGui
+from utils.lyrics_gui import LyricsGui, TerminalView
 from utils.fetch_lyrics import get_lyrics
-
+from utils.playback_sync import PlaybackSync
+from utils.prepare import Preparer, PreparedTrack, show
 
 LYRICS_LOADING = "LOADING"
+PREFETCH = 3  # the number of upcoming tracks to get lyrics for
 
 
 @dataclass
@@ -31,21 +44,37 @@ class SpotifyTrack:
     duration: int
     start_time: float
     is_playing: bool
-    time_offset: float = 0.2  # 0.2 to account for ping
+    time_offset: float = 0  # adjusted by hand, with "," and "."
     lyrics: Optional[list[tuple[float, str]]] = None
     lyrics_source: Optional[str] = None
     screens: Optional[list[tuple[float, np.ndarray]]] = None
+    transitions: Optional[list[Optional[np.ndarray]]] = None
+    packets: Optional[dict[bytes, bytes]] = None
+
+    @classmethod
+    def from_track(cls, track, start_time: Optional[float] = None):
+        """
+        From the currently playing track
+
+        :param start_time: when the track started, if it is known better than
+                           from its progress (see `PlaybackSync`)
+        """
+        current = cls.from_item(
+            track["item"], track["progress_ms"] / 1000, track["is_playing"]
+        )
+        if start_time is not None:
+            current.start_time = start_time
+        return current
 
     @classmethod
-    def from_track(cls, track):
-        title = re.sub(r"\(.*?\)", "", track["item"]["name"])  # remove brackets
+    def from_item(cls, item, progress: float = 0, is_playing: bool = False):
+        """From a track object (e.g. one in the queue)"""
+        title = re.sub(r"\(.*?\)", "", item["name"])  # remove brackets
         title = re.sub(r" - .*", "", title)  # remove hyphens
-        artist = track["item"]["artists"][0]["name"]
-        album = track["item"]["album"]["name"]
-        duration = round(track["item"]["duration_ms"] / 1000)
-        progress = track["progress_ms"] / 1000
+        artist = item["artists"][0]["name"]
+        album = item["album"]["name"]
+        duration = round(item["duration_ms"] / 1000)
         start_time = monotonic() - progress
-        is_playing = track["is_playing"]
         return cls(
             title.strip(), artist.strip(), album, duration, start_time, is_playing
         )
@@ -58,100 +87,262 @@ class SpotifyTrack:
         return False
 
 
+class Prefetcher:
+    """
+    Gets the lyrics for tracks before they start playing, and prepares them for
+    the sign, so that the first lines of a song aren't missed while we look
+    for its lyrics
+    """
+
+    def __init__(
+        self,
+        preparer: Preparer,
+        process: Callable,
+        workers: int = 2,
+        capacity: int = 2 * PREFETCH,
+    ):
+        """
+        :param preparer: prepares the lyrics for the sign
+        :param process: turns `Lyrics` into timed lines
+        :param workers: the number of tracks to fetch at once
+        :param capacity: the number of tracks to keep - the least recently
+                         wanted are dropped first
+        """
+        self._preparer = preparer
+        self._process = process
+        self._capacity = capacity
+        self._pool = futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="prefetch"
+        )
+        # reads the queue, so that it never waits behind (or holds up) a fetch
+        self._reader = futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="queue"
+        )
+        self._tracks: OrderedDict[tuple[str, str], futures.Future] = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(track: SpotifyTrack):
+        return track.title, track.artist
+
+    def prefetch(self, tracks: list[SpotifyTrack]):
+        """Starts getting the lyrics for these tracks, in order"""
+        with self._lock:
+            for track in tracks:
+                key = self._key(track)
+                if key not in self._tracks:
+                    self._tracks[key] = self._pool.submit(self._fetch, track)
+                self._tracks.move_to_end(key)
+
+            while len(self._tracks) > self._capacity:
+                _, future = self._tracks.popitem(last=False)
+                future.cancel()
+
+    def prefetch_queue(self, queue: Callable[[], list[SpotifyTrack]]) -> futures.Future:
+        """
+        Starts getting the lyrics for the tracks returned by `queue`, which is
+        called in the background (e.g. as it asks Spotify for its queue)
+        """
+        return self._reader.submit(lambda: self.prefetch(queue()))
+
+    def pop(self, track: SpotifyTrack) -> Optional[futures.Future]:
+        """The prefetch for a track, if there is one"""
+        with self._lock:
+            return self._tracks.pop(self._key(track), None)
+
+    def close(self):
+        self._reader.shutdown(wait=False, cancel_futures=True)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch(
+        self, track: SpotifyTrack
+    ) -> Optional[tuple[Optional[str], PreparedTrack]]:
+        lyrics = get_lyrics(
+            track.artist, track.title, album=track.album, duration=track.duration
+        )
+        if not lyrics:
+            return None
+        return lyrics.source, self._preparer.prepare(self._process(lyrics))
+
+
 class AutoLyricsDemo(LyricsDemo):
     """
     Attempt to automatically acquire lyrics from Spotify, using a bot with the capability to read the currently playing
     song.
     """
 
-    def __init__(self, sign: Sign, comms: SerialComms, lazy: bool = False):
+    def __init__(
+        self,
+        sign: Sign,
+        comms: SerialComms,
+        lazy: bool = False,
+        prefetch: int = PREFETCH,
+        spotify: Optional[spotipy.Spotify] = None,
+    ):
+        """
+        :param prefetch: the number of upcoming tracks in the queue to get the
+                         lyrics for in advance (0 to disable)
+        :param spotify: the Spotify client to use, instead of logging in
+        """
         super().__init__(sign, comms)
 
-        self._text = TextRenderer(MINECRAFT, sign.shape)
-        load_dotenv()
-        try:
-            self._auth = SpotifyOAuth(
-                scope="user-read-currently-playing",
-                redirect_uri="http://localhost:8080",
-            )
-        except spotipy.oauth2.SpotifyOauthError:
-            print(
-                "Note: You can specify SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET in a .env file"
-            )
-            raise
-        self._spotify = spotipy.Spotify(auth_manager=self._auth)
-        self._running = True
+        self._text = TextRenderer(FontStack(MINECRAFT), sign.shape)
+        # tracks are rendered and encoded in the background, ready to play
+        self._preparer = Preparer(sign, self._text)
+        self._prefetch = prefetch
+        self._prefetcher = Prefetcher(self._preparer, self._process_lyrics)
+        if spotify is None:
+            load_dotenv()
+            try:
+                self._auth = SpotifyOAuth(
+                    # the queue needs user-read-playback-state
+                    scope="user-read-currently-playing user-read-playback-state",
+                    redirect_uri="http://localhost:8080",
+                )
+            except spotipy.oauth2.SpotifyOauthError:
+                print(
+                    "Note: You can specify SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET in a .env file"
+                )
+                raise
+            spotify = spotipy.Spotify(auth_manager=self._auth)
+        self._spotify = spotify
+        # works out where playback is, and when to next ask
+        self._sync = PlaybackSync(self._spotify.currently_playing)
+
+        # events for the main loop, as (time, sequence, action) - see `run`
+        self._events: list[tuple[float, int, Callable[[], None]]] = []
+        self._sequence = itertools.count()
+        self._wakeup = os.pipe()
+        os.set_blocking(self._wakeup[1], False)
+        self._poller = futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="spotify"
+        )
+        self._polling: Optional[futures.Future] = None
 
         self._lazy = lazy
         self._show_lyrics = True
         self._track: Optional[SpotifyTrack] = None
+        self._index: Optional[int] = None
 
-    def _spotify_watcher(self):
-        self._track = None
-
-        while self._running:
-            track = self._spotify.currently_playing()
-            if track and track["item"]:  # ensure music is playing
-                current_track = SpotifyTrack.from_track(track)
-                if self._track != current_track:  # track has changed
-                    self._track = current_track
-                    self._track.lyrics_source = LYRICS_LOADING
+    def _schedule(self, when: float, action: Callable[[], None]):
+        """Runs `action` (on the main loop) once `monotonic()` reaches `when`"""
+        heapq.heappush(self._events, (when, next(self._sequence), action))
 
-                    self._show_lyrics = False
-                    Thread(target=self._fetch_lyrics, args=(current_track,)).start()
-
-                    # show the title
-                    self._sign.clear()
-                    for screen, text in self._text.long_text(
-                        self._track.title + " by " + self._track.artist
-                    ):
-                        self._sign.state = screen
-                        self._sign.update()
-                        sleep(1)
-                    self._sign.clear()
-
-                    # title displayed - we can now show the lyrics
-                    self._show_lyrics = True
-                else:
-                    # same track, but possibly different metadata
-                    if abs(current_track.start_time - self._track.start_time) > 2:
-                        self._track.start_time = current_track.start_time
-
-                    if current_track.is_playing != self._track.is_playing:
-                        self._track.is_playing = current_track.is_playing
+    def _wake(self):
+        """Wakes the main loop up, from any thread (e.g. when lyrics arrive)"""
+        try:
+            os.write(self._wakeup[1], b"\0")
+        except BlockingIOError:
+            pass  # it is already going to wake up
+
+    def _poll(self):
+        """Asks Spotify what is playing, in the background"""
+        if self._polling is None:
+            self._polling = self._poller.submit(self._sync.poll)
+            self._polling.add_done_callback(lambda _: self._wake())
+
+    def _on_poll(self, track):
+        """Handles what Spotify says is playing"""
+        self._schedule(monotonic() + self._sync.interval(), self._poll)
+
+        if track and track["item"]:  # ensure music is playing
+            current_track = SpotifyTrack.from_track(track, self._sync.start_time)
+            if self._track != current_track:  # track has changed
+                self._track = current_track
+                self._track.lyrics_source = LYRICS_LOADING
+                self._index = None
+
+                Thread(target=self._fetch_lyrics, args=(current_track,)).start()
+                if self._prefetch > 0:
+                    self._prefetcher.prefetch_queue(self._upcoming)
+                self._announce(current_track)
             else:
-                self._track = None
-                if self._lazy and self._comms.is_open:
-                    self._sign.clear()
-                    self._comms.close()
-
-            # fast exit
-            for i in range(4):
-                if self._running:
-                    sleep(0.5)
+                # same track, but possibly different metadata (the start time
+                #  is smoothed, so it only moves after a seek)
+                self._track.start_time = current_track.start_time
+
+                if current_track.is_playing != self._track.is_playing:
+                    self._track.is_playing = current_track.is_playing
+        else:
+            self._track = None
+            if self._lazy and self._comms.is_open:
+                self._sign.clear()
+                self._comms.close()
+
+    def _announce(self, track: SpotifyTrack):
+        """Shows the title of a track, a screen a second, before its lyrics"""
+        self._show_lyrics = False
+        self._sign.clear()
+
+        def show_title(screen):
+            if self._track is track:
+                self._sign.state = screen
+                self._sign.update()
+
+        def finish():
+            if self._track is track:
+                # title displayed - we can now show the lyrics
+                self._sign.clear()
+                self._show_lyrics = True
+
+        now = finished = monotonic()
+        screens = self._text.long_text(track.title + " by " + track.artist)
+        for i, (screen, _) in enumerate(screens):
+            self._schedule(now + i, functools.partial(show_title, screen))
+            finished = now + i + 1
+        self._schedule(finished, finish)
+
+    def _upcoming(self) -> list[SpotifyTrack]:
+        """The next tracks in the queue, to get the lyrics for in advance"""
+        try:
+            queue = self._spotify.queue()
+        except spotipy.SpotifyException:
+            # e.g. the token doesn't have the scope - just fetch as tracks play
+            self._prefetch = 0
+            return []
+        items = [item for item in (queue or {}).get("queue", []) if item]
+        return [SpotifyTrack.from_item(item) for item in items[: self._prefetch]]
 
     def _fetch_lyrics(self, track: SpotifyTrack):
         """so it can be run in a thread"""
-        lyrics = None
+        result = None
         try:
-            lyrics = get_lyrics(
-                track.artist, track.title, album=track.album, duration=track.duration
-            )
-        finally:
-            if self._track == track:
-                # track has not changed since starting to fetch the lyrics
+            # use the prefetch if it has started - otherwise it is stuck behind
+            #  other tracks, and it is quicker to fetch it now
+            future = self._prefetcher.pop(track)
+            if future is not None and not future.cancel():
+                result = future.result()
+            else:
+                lyrics = get_lyrics(
+                    track.artist,
+                    track.title,
+                    album=track.album,
+                    duration=track.duration,
+                )
                 if lyrics:
-                    self._track.screens, self._track.lyrics = self._split_into_screens(
+                    prepared = self._preparer.submit(
                         self._process_lyrics(lyrics)
-                    )
-                    self._track.lyrics_source = lyrics.source
+                    ).result()
+                    result = lyrics.source, prepared
+        finally:
+            current = self._track
+            if current == track:
+                # track has not changed since starting to fetch the lyrics
+                if result:
+                    source, prepared = result
+                    current.screens = prepared.screens
+                    current.transitions = prepared.transitions
+                    current.packets = prepared.packets
+                    current.lyrics = prepared.lyrics
+                    current.lyrics_source = source
                 else:
-                    self._track.screens, self._track.lyrics = None, None
-                    self._track.lyrics_source = None
+                    current.screens, current.lyrics = None, None
+                    current.lyrics_source = None
+            # only once the lyrics are in place, so the main loop sees them
+            self._wake()
 
-    def _handle_input(self, term, timeout, index):
+    def _handle_key(self, term, key, index):
         # controls - allow for skipping forwards/backwards
-        key = term.inkey(timeout=timeout)
         if key == ".":
             self._track.time_offset += 0.1
         elif key == ",":
@@ -175,88 +366,148 @@ class AutoLyricsDemo(LyricsDemo):
                     offset = self._track.lyrics[index + 1][0] - delta
                     self._track.time_offset += offset
 
+    def _hide_lyrics(self, track: SpotifyTrack):
+        if self._track is track:
+            self._sign.clear()
+            self._comms.close()
+
+    def _draw(self, gui: LyricsGui, view: TerminalView) -> Optional[float]:
+        """
+        Brings the terminal and the sign up to date, returning when they next
+        need updating (or `None` if nothing will change until the next event)
+        """
+        if self._track is None:
+            view.draw([f"{gui.term.red}-- Nothing Playing --{gui.term.normal}"])
+            return None
+
+        header = (
+            f"{gui.term.blue}Now Playing: {self._track.title} "
+            f"by {self._track.artist}{gui.term.normal}"
+        )
+
+        # get up-to-date lyrics
+        if self._track.lyrics is None:
+            if self._track.lyrics_source == LYRICS_LOADING:
+                view.draw(
+                    [header, "", f"{gui.term.red}Finding Lyrics...{gui.term.normal}"]
+                )
+                if self._show_lyrics:
+                    self._sign.state = self._text.text("[ loading ]")
+                    self._sign.update()
+            else:
+                view.draw([header, "", f"{gui.term.red}No Lyrics{gui.term.normal}"])
+                if self._show_lyrics:
+                    self._sign.state = self._text.text("x")
+                    self._sign.update()
+                    self._show_lyrics = False
+                    self._schedule(
+                        monotonic() + 1,
+                        functools.partial(self._hide_lyrics, self._track),
+                    )
+            return None
+
+        if not self._track.is_playing:
+            view.draw([header, "", f"{gui.term.red}Paused{gui.term.normal}"])
+            if self._show_lyrics:
+                self._sign.state = self._text.text("| |")
+                self._sign.update()
+                self._comms.close()
+            return None
+
+        if gui.track is not self._track:
+            gui.track = self._track
+        delta = monotonic() - self._track.start_time + self._track.time_offset
+        self._index, rows = gui.rows(delta, self._index)
+        view.draw(
+            [header]
+            + rows
+            + [
+                f"{gui.term.blue}offset: {self._track.time_offset:.2f}s / "
+                f"ping: {(self._sync.round_trip or 0) * 1000:.0f}ms / "
+                f"source: {self._track.lyrics_source}{gui.term.normal}"
+            ]
+        )
+
+        # the clock on screen changes every tenth of a second
+        next_time = (math.floor(delta * 10) + 1) / 10
+        if self._show_lyrics:
+            if 0 <= self._index < len(self._track.screens):
+                frame = frame_at(
+                    self._track.screens, self._track.transitions, self._index, delta
+                )
+                show(self._sign, frame, self._track.packets)
+                change = next_change(
+                    self._track.screens, self._track.transitions, self._index, delta
+                )
+                if change is not None:
+                    next_time = min(next_time, change)
+            else:
+                self._sign.state = None
+                self._sign.update()
+        return next_time - self._track.time_offset + self._track.start_time
+
     def run(self):
         """The main code of the demo"""
-        spotify_watcher = Thread(target=self._spotify_watcher)
-        spotify_watcher.start()
+        # the loop sleeps until the next thing needs doing: a scheduled event
+        #  (see `_schedule`), the next frame, a key press or a wake up
+        selector = selectors.DefaultSelector()
+        selector.register(sys.stdin, selectors.EVENT_READ)
+        selector.register(self._wakeup[0], selectors.EVENT_READ)
+        self._schedule(monotonic(), self._poll)
         try:
             gui = LyricsGui(None)
             with gui.term.cbreak(), gui.term.fullscreen(), gui.term.hidden_cursor():
-                print(gui.term.clear())
+                print(gui.term.clear() + gui.term.home, end="")
+                # only what has changed is written to the terminal each tick
+                view = TerminalView(gui.term, 6)
                 while True:
-                    if self._track is None:
-                        print(
-                            f"{gui.term.red}-- Nothing Playing --{gui.term.normal}",
-                            end="\r",
-                            flush=True,
-                        )
-                        sleep(1)
-                        continue
-
-                    print(gui.term.home, end="")
-
-                    print(
-                        f"{gui.term.clear_eol}{gui.term.blue}Now Playing: {self._track.title} "
-                        f"by {self._track.artist}{gui.term.normal}"
-                    )
-
-                    # get up-to-date lyrics
-                    if self._track.lyrics is None:
-                        if self._track.lyrics_source == LYRICS_LOADING:
-                            print(
-                                f"{gui.term.clear_eos()}\n{gui.term.red}Finding Lyrics...{gui.term.normal}\n\n\n"
+                    if self._polling is not None and self._polling.done():
+                        polling, self._polling = self._polling, None
+                        try:
+                            track = polling.result()
+                        except (spotipy.SpotifyException, RequestException):
+                            # try again at the next poll
+                            self._schedule(
+                                monotonic() + self._sync.interval(), self._poll
                             )
-                            if self._show_lyrics:
-                                self._sign.state = self._text.text("[ loading ]")
-                                self._sign.update()
                         else:
-                            print(
-                                f"{gui.term.clear_eos()}\n{gui.term.red}No Lyrics{gui.term.normal}\n\n\n"
-                            )
-                            if self._show_lyrics:
-                                self._sign.state = self._text.text("x")
-                                self._sign.update()
-                                sleep(1)
-                                self._sign.clear()
-                                self._comms.close()
-                                self._show_lyrics = False
-
-                        sleep(0.25)
-                    elif not self._track.is_playing:
-                        print(
-                            f"{gui.term.clear_eos()}\n{gui.term.red}Paused{gui.term.normal}\n\n\n"
-                        )
-                        if self._show_lyrics:
-                            self._sign.state = self._text.text("| |")
-                            self._sign.update()
-                            self._comms.close()
-                        sleep(0.25)
-                    else:
-                        gui.track = self._track
-                        delta = (
-                            monotonic()
-                            - self._track.start_time
-                            + self._track.time_offset
-                        )
-                        index = gui.show(delta)
-                        print(
-                            f"{gui.term.clear_eol()}{gui.term.blue}offset: {self._track.time_offset:.2f}s / "
-                            f"source: {self._track.lyrics_source}{gui.term.normal}"
-                        )
-
-                        if self._show_lyrics:
-                            if 0 <= index < len(self._track.screens):
-                                self._sign.state = self._track.screens[index][1]
-                                self._sign.update()
-                            else:
-                                self._sign.state = None
-                                self._sign.update()
-                        self._handle_input(gui.term, 0.05, index)
+                            self._on_poll(track)
+
+                    while self._events and self._events[0][0] <= monotonic():
+                        _, _, action = heapq.heappop(self._events)
+                        action()
+
+                    deadline = self._draw(gui, view)
+                    if self._events:
+                        deadline = min(deadline or math.inf, self._events[0][0])
+                    timeout = None if deadline is None else deadline - monotonic()
+
+                    for key, _ in selector.select(
+                        None if timeout is None else max(0, timeout)
+                    ):
+                        if key.fileobj == self._wakeup[0]:
+                            os.read(self._wakeup[0], 1024)
+                            continue
+                        while pressed := gui.term.inkey(timeout=0):
+                            # as before, keys only apply to lyrics being played
+                            #  (the index is only known once they are drawn)
+                            if (
+                                self._track is not None
+                                and self._track.is_playing
+                                and self._track.lyrics
+                                and self._index is not None
+                            ):
+                                self._handle_key(gui.term, pressed, self._index)
 
         except KeyboardInterrupt:
             input("Press enter to exit...")
         finally:
-            self._running = False
+            selector.close()
+            for fd in self._wakeup:
+                os.close(fd)
+            self._poller.shutdown(wait=False, cancel_futures=True)
+            self._prefetcher.close()
+            self._preparer.close()
 
 
 if __name__ == "__main__":
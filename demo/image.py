@@ -0,0 +1,36 @@
+from PIL import Image
+
+from demo.sample_demo import Demo
+from flippy.images import Dither, greyscale, play
+from flippy.temporal import build_cycle, play_cycle
+
+
+class ImageDemo(Demo):
+    def run(self):
+        path = input("Image, GIF or directory of frames: ").strip()
+        print("Dithering:")
+        for method in Dither:
+            print(f"{method.value:2}: {method.name.title()}")
+        method = Dither(int(input("Choose an option index: ")))
+
+        try:
+            play(self._sign, path, method, loop=True)
+        except KeyboardInterrupt:
+            pass
+
+
+class GreyscaleDemo(Demo):
+    def run(self):
+        path = input("Image: ").strip()
+        with Image.open(path) as image:
+            grey = greyscale(image, self._sign.shape)
+
+        cycle = build_cycle(self._sign, grey)
+        print(
+            f"Cycle of {cycle.length} frames ({len(cycle.frames)} sent, "
+            f"{cycle.bytes_per_cycle} bytes), "
+            f"estimated {cycle.refresh_rate:.2f} cycles per second"
+        )
+        print("Press Ctrl+C to stop")
+        refresh_rate = play_cycle(self._sign, cycle)
+        print(f"Achieved {refresh_rate:.2f} cycles per second")
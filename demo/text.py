@@ -2,7 +2,9 @@ import time
 import datetime as dt
 
 from demo.sample_demo import Demo
-from flippy.text_rendering import TextRenderer, MINECRAFT
+from flippy.compositor import Compositor
+from flippy.sign import Region
+from flippy.text_rendering import FontStack, TextAlign, TextRenderer, MINECRAFT
 
 
 class TextDemo(Demo):
@@ -10,7 +12,8 @@ class TextDemo(Demo):
 
     def run(self):
         text = input("What text do you want to display? ")
-        renderer = TextRenderer(MINECRAFT, self._sign.shape)
+        # typed text can have accents, which are transliterated if need be
+        renderer = TextRenderer(FontStack(MINECRAFT), self._sign.shape)
         self._sign.state = renderer.text(text)
         self._sign.update()
         input("Press enter to exit...")
@@ -23,18 +26,49 @@ class ClockDemo(Demo):
     """Demo of displaying the time on the sign"""
 
     @staticmethod
-    def get_time():
+    def get_time(seconds: bool = True):
         now = dt.datetime.now()
+        if not seconds:
+            return f"{now.hour:02}:{now.minute:02}"
         return f"{now.hour:02}:{now.minute:02}:{now.second:02}"
 
+    @classmethod
+    def producer(
+        cls,
+        shape: tuple[int, int],
+        seconds: bool = True,
+        align: TextAlign = TextAlign.CENTRE,
+    ):
+        """Draws the clock into a region of the sign (see `Compositor`)"""
+        renderer = TextRenderer(MINECRAFT, shape)
+        # only the digits that have changed are redrawn each second
+        clock = renderer.field("00:00:00" if seconds else "00:00", align=align)
+
+        def _draw(region: Region):
+            clock.update(cls.get_time(seconds), region)
+
+        return _draw
+
     def run(self):
-        renderer = TextRenderer(MINECRAFT, self._sign.shape)
-        while True:
-            update_time = time.monotonic()
-            self._sign.state = renderer.text(self.get_time())
-            self._sign.update()
-            update_time = time.monotonic() - update_time
-            time.sleep(1 - update_time)
+        compositor = Compositor(self._sign)
+        compositor.add(self.producer(self._sign.shape), interval=1)
+        compositor.run()
+
+
+class MarqueeDemo(Demo):
+    """Demo of scrolling long text across the sign"""
+
+    def run(self):
+        text = input("What text do you want to display? ")
+        renderer = TextRenderer(FontStack(MINECRAFT), self._sign.shape)
+        try:
+            self._sign.animate(renderer.marquee(text, speed=20, loop=True))
+        except KeyboardInterrupt:
+            pass
+        input("Press enter to exit...")
+
+    def cleanup(self):
+        self._sign.clear()
 
 
 class MultiTextDemo(Demo):
@@ -42,7 +76,7 @@ class MultiTextDemo(Demo):
 
     def run(self):
         text = input("What text do you want to display? ")
-        renderer = TextRenderer(MINECRAFT, self._sign.shape)
+        renderer = TextRenderer(FontStack(MINECRAFT), self._sign.shape)
         states = renderer.long_text(text)
         for state in states:
             self._sign.state = state
@@ -1,19 +1,27 @@
 import json
-import time
 from os import getenv
 
-import numpy as np
-import requests
 from dotenv import load_dotenv
 
 from demo.sample_demo import Demo
-from flippy.text_rendering import TextAlign, TextRenderer, MINECRAFT, NEWBASIC_3X5_KERN
+from demo.text import ClockDemo
+from flippy.compositor import Compositor
+from flippy.sign import Region
+from flippy.text_rendering import (
+    TextAlign,
+    TextRenderer,
+    TextSpan,
+    MINECRAFT,
+    NEWBASIC_3X5_KERN,
+)
+from utils.http_client import get_client
 
 
 class TrainDemo(Demo):
     """Demo of displaying text on the sign. This uses one of my other projects (trainTable) as the data source"""
 
-    def run(self):
+    @staticmethod
+    def _get_route():
         load_dotenv()
 
         if (key := getenv("TRAINTABLE_KEY")) is None:
@@ -23,27 +31,55 @@ class TrainDemo(Demo):
         destination = input("Destination (CRS)? ").upper()
         if destination == "":
             destination = "ANY"
-        renderer = TextRenderer(MINECRAFT, self._sign.shape)
-        renderer_2 = TextRenderer(NEWBASIC_3X5_KERN, self._sign.shape)
-        base_state = renderer.text(f"{origin}>{destination}", align=TextAlign.LEFT)
+        return origin, destination, key
+
+    @classmethod
+    def producer(
+        cls,
+        shape: tuple[int, int],
+        origin: str,
+        destination: str,
+        key: str,
+        show_route: bool = True,
+    ):
+        """Draws the next departures into a region of the sign (see `Compositor`)"""
+        renderer = TextRenderer(MINECRAFT, shape)
+        route = TextSpan(f"{origin}>{destination}")
+
+        def _draw(region: Region):
+            t1, t2 = cls._get_train(origin, destination, key)
+            # the times are moved up a pixel, to line up with the route
+            times = TextSpan(
+                f"{t1}, {t2}",
+                font=NEWBASIC_3X5_KERN,
+                align=TextAlign.RIGHT,
+                offset=(0, -1) if show_route else (0, 0),
+            )
+            region.state = renderer.rich_text([route, times] if show_route else [times])
+
+        return _draw
+
+    def run(self):
+        origin, destination, key = self._get_route()
+        compositor = Compositor(self._sign)
+        # the departures are fetched in the background, so never hold up the sign
+        compositor.add(
+            self.producer(self._sign.shape, origin, destination, key),
+            interval=60,
+            background=True,
+        )
 
         try:
-            while True:
-                t1, t2 = self._get_train(origin, destination, key)
-                times = np.zeros(self._sign.shape)
-                times[:, :-1] = renderer_2.text(f"{t1}, {t2}", align=TextAlign.RIGHT)[
-                    :, 1:
-                ]
-                self._sign.state = base_state + times
-                self._sign.update()
-                time.sleep(60)
+            compositor.run()
         except KeyboardInterrupt:
             pass
+        finally:
+            compositor.close()
         input("Press enter to exit...")
 
     @staticmethod
     def _get_train(og, dst, key):
-        response = requests.get(
+        response = get_client().get(
             f"https://tt.nthn.uk/ldb/dep/{og}/{dst}?token={key}&filter=true&filter_formation=true"
         )
         if response.status_code == 200:
@@ -70,3 +106,41 @@ class TrainDemo(Demo):
 
     def cleanup(self):
         self._sign.clear()
+
+
+class DashboardDemo(TrainDemo):
+    """Demo of showing the time and the next trains side by side on the sign"""
+
+    def run(self):
+        origin, destination, key = self._get_route()
+        width, height = self._sign.shape
+        clock_width = TextRenderer(MINECRAFT, self._sign.shape).field("00:00").width
+
+        compositor = Compositor(self._sign)
+        compositor.add(
+            ClockDemo.producer(
+                (clock_width, height), seconds=False, align=TextAlign.LEFT
+            ),
+            interval=1,
+            shape=(clock_width, height),
+        )
+        compositor.add(
+            self.producer(
+                (width - clock_width - 1, height),
+                origin,
+                destination,
+                key,
+                show_route=False,
+            ),
+            interval=60,
+            position=(clock_width + 1, 0),
+            background=True,  # so the clock keeps ticking while it loads
+        )
+
+        try:
+            compositor.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            compositor.close()
+        input("Press enter to exit...")
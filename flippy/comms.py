@@ -1,5 +1,4 @@
 import binascii
-import math
 import logging
 from enum import Enum
 from time import sleep
@@ -10,6 +9,21 @@ from serial.rfc2217 import Serial as RemoteSerial
 import numpy as np
 
 
+def pack_image(image: np.ndarray) -> np.ndarray:
+    """
+    Packs an image (stored column-first, as `(WIDTH, HEIGHT)`) into the layout
+    used by the protocol, with shape `(WIDTH, ceil(HEIGHT / 8))`: each column
+    is sent as a run of bytes, with the least significant bit at the top.
+    Stacks of frames (with the shape `(N, WIDTH, HEIGHT)`) are packed in one go
+    """
+    return np.packbits(image.astype(bool), axis=-1, bitorder="little")
+
+
+def unpack_image(packed: np.ndarray, height: int) -> np.ndarray:
+    """Reverses `pack_image`, returning a boolean image of the given height"""
+    return np.unpackbits(packed, axis=-1, count=height, bitorder="little").astype(bool)
+
+
 class Commands(Enum):
     START_TEST_PATTERN = 3
     CLEAR_SCREEN = 12
@@ -20,6 +34,7 @@ class BaseSerialComms:
     """Low-level serial comms, implementing basic communication protocols"""
 
     MOCK = "MOCK"
+    BAUDRATE = 4800
 
     def __init__(self, port: str, address: int = 0, lazy: bool = False) -> None:
         self._port = port
@@ -39,9 +54,9 @@ class BaseSerialComms:
             elif self._port.startswith("rfc2217://"):
                 if not self._port.endswith(":2217") and "?" not in self._port:
                     self._port += ":2217"
-                self._serial = RemoteSerial(self._port, baudrate=4800)
+                self._serial = RemoteSerial(self._port, baudrate=self.BAUDRATE)
             else:
-                self._serial = Serial(self._port, baudrate=4800, timeout=10)
+                self._serial = Serial(self._port, baudrate=self.BAUDRATE, timeout=10)
             return True
         else:
             return False
@@ -76,9 +91,8 @@ class BaseSerialComms:
         else:
             raise ValueError("Address out of range! (0..15)")
 
-    def execute(self, command: Commands, payload: Optional[bytes] = None):
-        """Executes a provided command"""
-        self._logger.debug("Executing command %s", command.name)
+    def build_packet(self, command: Commands, payload: Optional[bytes] = None) -> bytes:
+        """Builds the packet for a command, ready to be written to the sign"""
         # add header: start byte, command, address
         packet = b"\x02"
         packet += self._to_ascii_hex(command.value)
@@ -89,7 +103,10 @@ class BaseSerialComms:
 
         packet += b"\x03"
         packet += self._to_ascii_hex(self._checksum(packet), full_byte=True)
+        return packet
 
+    def write(self, packet: bytes):
+        """Writes a packet (see `build_packet`) to the sign"""
         if not self.is_open:
             self.open()
 
@@ -98,6 +115,18 @@ class BaseSerialComms:
         else:
             self._serial.write(packet)
 
+    def write_time(self, packet: bytes) -> float:
+        """
+        The time it takes to send a packet at the link's baud rate, in seconds
+        (each byte is sent as 10 bits: a start bit, 8 data bits and a stop bit)
+        """
+        return len(packet) * 10 / self.BAUDRATE
+
+    def execute(self, command: Commands, payload: Optional[bytes] = None):
+        """Executes a provided command"""
+        self._logger.debug("Executing command %s", command.name)
+        self.write(self.build_packet(command, payload))
+
     @staticmethod
     def _to_ascii_hex(value: int | bytes | str, full_byte: bool = False) -> bytes:
         """
@@ -145,31 +174,34 @@ class SerialComms(BaseSerialComms):
             self._logger.debug("Test pattern complete, clearing")
             self.clear()
 
-    def _image_to_packet(self, image: np.ndarray) -> bytes:
-        # we store the array column-first (to make previews easier) - however,
-        #  sending data requires us to structure it as (rows, columns), due to
-        #  the protocol used
-        image = image.T
+    def update_packed(self, packed: np.ndarray):
+        """
+        Updates the display with an image that has already been packed into
+        the protocol's column-byte layout (see `pack_image`)
+        """
+        self.write(self.encode_packed(packed))
 
-        # step 1: get the 'full' image size - height must be a multiple of 8
-        #         (as we send each line as a byte)
-        (rows, columns) = image.shape
-        rows_padded = math.ceil(rows / 8) * 8
+    def encode_packed(self, packed: np.ndarray) -> bytes:
+        """
+        Encodes the whole packet that `update_packed` would send, so that it
+        can be prepared ahead of time and sent later with `write`
+        """
+        return self.build_packet(Commands.WRITE_IMAGE, self._packed_to_packet(packed))
 
-        # step 2: make this image contain the same content as our target image
-        image_padded = np.full((rows_padded, columns), False, dtype=bool)
-        image_padded[:rows, :] = image.astype(bool)
+    def _image_to_packet(self, image: np.ndarray) -> bytes:
+        # we store the array column-first (to make previews easier), and the
+        #  protocol sends the image one column at a time - each column is
+        #  padded to a whole number of bytes, with the top row in the lowest bit
+        return self._packed_to_packet(pack_image(image))
 
-        # step 3: convert this to bits from an array
-        image_padded_bytes = np.flipud(image_padded).view(np.uint8)
-        image_padded_bytes = np.packbits(image_padded_bytes, axis=0)
-        image_padded_bytes = bytes(np.flipud(image_padded_bytes).flatten("F"))
+    def _packed_to_packet(self, packed: np.ndarray) -> bytes:
+        image_bytes = np.ascontiguousarray(packed, dtype=np.uint8).tobytes()
 
-        # step 4: calculate the image header size (max 1 byte)
-        image_size = len(image_padded_bytes) & 0xFF
+        # calculate the image header size (max 1 byte)
+        image_size = len(image_bytes) & 0xFF
 
-        # step 5: convert to ASCII to make it happy, combine into a packet
+        # convert to ASCII to make it happy, combine into a packet
         packet = self._to_ascii_hex(image_size, full_byte=True)
-        packet += self._to_ascii_hex(image_padded_bytes)
+        packet += self._to_ascii_hex(image_bytes)
 
         return packet
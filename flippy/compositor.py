@@ -0,0 +1,153 @@
+"""
+Runs several sources of content on one sign at once, each in its own region
+(or "zone") of the sign - e.g. a clock on the left, and train departures on
+the right. Each zone is redrawn by its own producer at its own rate, and the
+sign is only written to once per tick, if anything has actually changed.
+
+Producers that are slow (e.g. ones that wait on the network) can be run in the
+background: they draw onto an off-screen copy of their zone on a worker thread,
+and the finished frame is shown on the next tick - so the other zones never
+wait for them
+"""
+
+import heapq
+import logging
+import threading
+from concurrent import futures
+from time import monotonic
+from typing import Callable, Optional
+
+import numpy as np
+
+from flippy.sign import Region, Sign
+
+# producers draw onto their region (see `Region`), e.g. with `Region.state`,
+#  `Region.blit` or `TextField.update`
+Producer = Callable[[Region], None]
+
+
+class Compositor:
+    def __init__(self, sign: Sign):
+        self._sign = sign
+        self._logger = logging.getLogger("Compositor")
+        # each zone is (region, producer, interval, off-screen region or None)
+        self._zones: list[tuple[Region, Producer, float, Optional[Region]]] = []
+        self._schedule: list[tuple[float, int]] = []
+        self._writes = 0
+
+        # zones being drawn in the background, by index
+        self._drawing: dict[int, futures.Future] = {}
+        self._executor: Optional[futures.ThreadPoolExecutor] = None
+        self._ready = threading.Event()
+
+    @property
+    def sign(self):
+        return self._sign
+
+    @property
+    def writes(self):
+        """The number of times the sign has been written to"""
+        return self._writes
+
+    def add(
+        self,
+        producer: Producer,
+        interval: float,
+        position: tuple[int, int] = (0, 0),
+        shape: Optional[tuple[int, int]] = None,
+        background: bool = False,
+    ) -> Region:
+        """
+        Adds a zone to the sign. Producers are called on the compositor's
+        thread, so should return quickly - unless they run in the background
+
+        :param producer: draws the zone - this is called with its `Region`
+        :param interval: the time between redraws of the zone, in seconds
+        :param position: the top-left corner of the zone, as `(x, y)`
+        :param shape: the size of the zone (defaults to the rest of the sign)
+        :param background: runs the producer on a worker thread, drawing onto
+                           an off-screen region, which is shown once it has
+                           finished. A zone is only drawn once at a time
+        """
+        if shape is None:
+            shape = (
+                self._sign.shape[0] - position[0],
+                self._sign.shape[1] - position[1],
+            )
+        region = self._sign.region(position, shape)
+        if any(region.overlaps(zone) for zone, _, _, _ in self._zones):
+            raise ValueError("Zones cannot overlap")
+
+        canvas = None
+        if background:
+            canvas = Sign(shape, comms=None).region((0, 0), shape)
+        self._zones.append((region, producer, interval, canvas))
+        heapq.heappush(self._schedule, (monotonic(), len(self._zones) - 1))
+        return region
+
+    def step(self, now: Optional[float] = None) -> bool:
+        """
+        Redraws every zone that is due, and then updates the sign if anything
+        has changed
+
+        :returns: true if the sign was written to
+        """
+        now = monotonic() if now is None else now
+
+        # show the zones that have finished drawing in the background
+        self._ready.clear()
+        for index, future in list(self._drawing.items()):
+            if future.done():
+                del self._drawing[index]
+                self._zones[index][0].state = future.result()
+
+        while self._schedule and self._schedule[0][0] <= now:
+            due, index = heapq.heappop(self._schedule)
+            region, producer, interval, canvas = self._zones[index]
+            if canvas is None:
+                producer(region)
+            elif index not in self._drawing:
+                # (if the last draw is still going, this one is skipped)
+                self._drawing[index] = self._submit(producer, canvas)
+            # if a zone falls behind, skip ahead rather than trying to catch up
+            heapq.heappush(self._schedule, (max(due + interval, now), index))
+
+        if self._sign.up_to_date:
+            return False
+        self._sign.update()
+        self._writes += 1
+        return True
+
+    def _submit(self, producer: Producer, canvas: Region) -> futures.Future:
+        if self._executor is None:
+            self._executor = futures.ThreadPoolExecutor(thread_name_prefix="compositor")
+
+        def draw() -> np.ndarray:
+            producer(canvas)
+            return canvas.state.copy()
+
+        future = self._executor.submit(draw)
+        future.add_done_callback(lambda _: self._ready.set())
+        return future
+
+    def close(self):
+        """Stops the background workers (without waiting for them)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._drawing.clear()
+
+    def run(self, duration: Optional[float] = None):
+        """Runs the zones for `duration` seconds (or forever)"""
+        if not self._zones:
+            raise ValueError("No zones to run")
+
+        end = None if duration is None else monotonic() + duration
+        while end is None or monotonic() < end:
+            self.step()
+            next_due = self._schedule[0][0]
+            if end is not None:
+                next_due = min(next_due, end)
+            if (delay := next_due - monotonic()) > 0:
+                # wake up early if a zone finishes drawing in the background
+                self._ready.wait(delay)
@@ -0,0 +1,242 @@
+"""
+Converts images (including animated GIFs and directories of frames) into
+frames for a sign: each image is scaled to fit the sign, and then dithered
+down to one bit per pixel. Animations are streamed, so only a few frames are
+held in memory at once
+"""
+
+import pathlib
+from enum import Enum
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from time import monotonic, sleep
+from typing import Iterator, Optional
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from flippy.sign import Sign
+
+
+class Dither(Enum):
+    THRESHOLD = 0  # each pixel is on if it is brighter than half
+    ORDERED = 1  # compare pixels to a tiled Bayer matrix
+    DIFFUSION = 2  # Floyd-Steinberg error diffusion
+
+
+def greyscale(
+    image: Image.Image, shape: tuple[int, int], stretch: bool = False
+) -> np.ndarray:
+    """
+    Scales an image to fit a sign, returning its brightness (0 to 1) as an
+    array of shape `(WIDTH, HEIGHT)`. Unless `stretch` is set, the aspect ratio
+    is kept, and any space left around the image is black
+    """
+    if image.mode in ("RGBA", "LA", "P"):
+        # anything transparent is treated as black
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (0, 0, 0, 255))
+        image = Image.alpha_composite(background, image)
+    image = image.convert("L")
+
+    width, height = shape
+    if stretch:
+        scaled = image.resize((width, height), Image.Resampling.LANCZOS)
+    else:
+        scale = min(width / image.width, height / image.height)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        scaled = Image.new("L", (width, height))
+        scaled.paste(
+            image.resize(size, Image.Resampling.LANCZOS),
+            ((width - size[0]) // 2, (height - size[1]) // 2),
+        )
+
+    return np.asarray(scaled, dtype=np.float32).T / 255
+
+
+def bayer_matrix(size: int = 4) -> np.ndarray:
+    """A `size` x `size` Bayer matrix of thresholds (size must be a power of 2)"""
+    matrix = np.zeros((1, 1))
+    while matrix.shape[0] < size:
+        matrix = np.block(
+            [[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]]
+        )
+    return (matrix + 0.5) / matrix.size
+
+
+def threshold(grey: np.ndarray, level: float = 0.5) -> np.ndarray:
+    return grey >= level
+
+
+def ordered(grey: np.ndarray, size: int = 4) -> np.ndarray:
+    matrix = bayer_matrix(size)
+    x = np.arange(grey.shape[0]) % size
+    y = np.arange(grey.shape[1]) % size
+    return grey >= matrix[x[:, None], y[None, :]]
+
+
+def error_diffusion(grey: np.ndarray) -> np.ndarray:
+    """
+    Floyd-Steinberg dithering. Each pixel only depends on pixels to its left,
+    or on the row above - so every pixel on the same "wavefront" (the diagonal
+    line where `x + 2y` is constant) can be processed at once
+    """
+    # work in (rows, columns), so that the rows are processed top to bottom
+    image = grey.T.astype(np.float32, copy=True)
+    output = np.zeros(image.shape, dtype=bool)
+    height, width = image.shape
+
+    for wavefront in range(width + 2 * (height - 1)):
+        y = np.arange(
+            max(0, -(-(wavefront - width + 1) // 2)),
+            min(height - 1, wavefront // 2) + 1,
+        )
+        x = wavefront - 2 * y
+
+        output[y, x] = image[y, x] >= 0.5
+        error = image[y, x] - output[y, x]
+
+        right = x + 1 < width
+        image[y[right], x[right] + 1] += error[right] * (7 / 16)
+
+        below = y + 1 < height
+        left = below & (x > 0)
+        image[y[left] + 1, x[left] - 1] += error[left] * (3 / 16)
+        image[y[below] + 1, x[below]] += error[below] * (5 / 16)
+        below_right = below & right
+        image[y[below_right] + 1, x[below_right] + 1] += error[below_right] * (1 / 16)
+
+    return output.T
+
+
+def dither(grey: np.ndarray, method: Dither = Dither.DIFFUSION) -> np.ndarray:
+    """Converts a greyscale image (see `greyscale`) to one bit per pixel"""
+    if method is Dither.THRESHOLD:
+        return threshold(grey)
+    elif method is Dither.ORDERED:
+        return ordered(grey)
+    elif method is Dither.DIFFUSION:
+        return error_diffusion(grey)
+    else:
+        raise ValueError("Unknown Dither")
+
+
+def source_frames(
+    source: Image.Image | str | pathlib.Path, frame_duration: float = 0
+) -> Iterator[tuple[Image.Image, float]]:
+    """
+    Reads the frames of an image, an animated image (e.g. a GIF), or a
+    directory of images (in name order), one at a time
+
+    :param frame_duration: the time to show each frame for, in seconds, if the
+                           source does not say (only animations do)
+    :returns: pairs of `(frame, duration)`
+    """
+    if isinstance(source, Image.Image):
+        images = [source]
+    else:
+        path = pathlib.Path(source)
+        if path.is_dir():
+            extensions = Image.registered_extensions()
+            images = (
+                file
+                for file in sorted(path.iterdir())
+                if file.suffix.lower() in extensions
+            )
+        else:
+            images = [path]
+
+    for image in images:
+        opened = not isinstance(image, Image.Image)
+        if opened:
+            image = Image.open(image)
+        try:
+            for frame in ImageSequence.Iterator(image):
+                duration = frame.info.get("duration")
+                yield frame, frame_duration if duration is None else duration / 1000
+        finally:
+            if opened:
+                image.close()
+
+
+def stream(
+    source: Image.Image | str | pathlib.Path,
+    shape: tuple[int, int],
+    method: Dither = Dither.DIFFUSION,
+    frame_duration: float = 0,
+    stretch: bool = False,
+    prefetch: int = 4,
+) -> Iterator[tuple[np.ndarray, float]]:
+    """
+    Converts the frames of a source (see `source_frames`) for a sign, using a
+    background thread to stay up to `prefetch` frames ahead of playback
+
+    :returns: pairs of `(frame, duration)`
+    """
+    frames: Queue = Queue(maxsize=prefetch)
+    stopped = Event()
+    finished = object()
+
+    def _put(item):
+        # give up if playback has stopped, rather than waiting forever
+        while not stopped.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _convert():
+        try:
+            for image, duration in source_frames(source, frame_duration):
+                frame = dither(greyscale(image, shape, stretch), method)
+                if not _put((frame, duration)):
+                    return
+        except Exception as e:
+            _put(e)
+        _put(finished)
+
+    worker = Thread(target=_convert, daemon=True)
+    worker.start()
+    try:
+        while (item := frames.get()) is not finished:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+        try:
+            while True:
+                frames.get_nowait()
+        except Empty:
+            pass
+
+
+def play(
+    sign: Sign,
+    source: Image.Image | str | pathlib.Path,
+    method: Dither = Dither.DIFFUSION,
+    frame_duration: Optional[float] = None,
+    loop: bool = False,
+):
+    """
+    Shows an image or animation on a sign. Frames are shown for as long as the
+    animation says, or as fast as the sign allows if it doesn't
+
+    :param frame_duration: overrides the time to show each frame for
+    """
+    while True:
+        next_frame = monotonic()
+        for frame, duration in stream(source, sign.shape, method, frame_duration or 0):
+            if frame_duration is not None:
+                duration = frame_duration
+            if (delay := next_frame - monotonic()) > 0:
+                sleep(delay)
+            next_frame = max(next_frame, monotonic()) + duration
+
+            sign.state = frame
+            sign.update()
+
+        if not loop:
+            break
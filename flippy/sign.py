@@ -1,18 +1,26 @@
 import logging
-from typing import Optional
+from typing import Iterable, Optional
 
 import numpy as np
-from flippy.comms import SerialComms
+from flippy.comms import SerialComms, pack_image, unpack_image
+from flippy.transforms import Mounting, mount
 
 
 class Sign:
     """Class representing a single sign"""
 
-    def __init__(self, shape: tuple[int, int], comms: SerialComms):
+    def __init__(
+        self,
+        shape: tuple[int, int],
+        comms: SerialComms,
+        mounting: Mounting = Mounting.NORMAL,
+    ):
         """
         :param shape: the size of the sign, in the form `(WIDTH, HEIGHT)`
         :param comms: an initialised `SerialComms` object to communicate with
                       the sign
+        :param mounting: how the sign is mounted - e.g. for a sign that is
+                         upside down, every frame is rotated as it is sent
         """
         self._logger = logging.getLogger("Sign")
         if shape[0] < shape[1]:
@@ -22,8 +30,10 @@ class Sign:
             )
         self._shape = shape
         self._comms = comms
+        self._mounting = mounting
         self._state = np.full(shape, False, dtype=bool)
         self._current_state = None
+        self._current_packed = None
         self._up_to_date = False
 
     @property
@@ -31,9 +41,22 @@ class Sign:
         """The dimensions of the sign in the form `(WIDTH, HEIGHT)`"""
         return self._shape
 
+    @property
+    def comms(self):
+        """The `SerialComms` used to communicate with the sign"""
+        return self._comms
+
+    @property
+    def mounting(self):
+        """How the sign is mounted (see `Mounting`)"""
+        return self._mounting
+
     @property
     def current_state(self):
         """The current state of the physical sign."""
+        if self._current_state is None and self._current_packed is not None:
+            # the last update was packed, so only unpack it if it is needed
+            self._current_state = unpack_image(self._current_packed, self.shape[1])
         return self._current_state
 
     @property
@@ -86,20 +109,99 @@ class Sign:
         else:
             self._up_to_date = False
 
+    def blit(self, image: np.ndarray, position: tuple[int, int] = (0, 0)):
+        """
+        Draws an image onto part of `state`, in-place, with its top-left corner
+        at `position`. Anything that falls outside of the sign is clipped. Note
+        that this does not update the sign: you must call `update` for that
+        """
+        x, y = position
+        x_start, y_start = max(x, 0), max(y, 0)
+        x_end = min(x + image.shape[0], self.shape[0])
+        y_end = min(y + image.shape[1], self.shape[1])
+        if x_start >= x_end or y_start >= y_end:
+            return
+
+        region = self._state[x_start:x_end, y_start:y_end]
+        image = image[x_start - x : x_end - x, y_start - y : y_end - y]
+        if not np.array_equal(region, image):
+            region[:] = image
+            self._up_to_date = self._current_state is not None and np.array_equal(
+                self._state, self._current_state
+            )
+
+    def region(self, position: tuple[int, int], shape: tuple[int, int]) -> "Region":
+        """
+        A rectangular part of the sign, which can be drawn on separately (see
+        `Region`)
+
+        :param position: the top-left corner of the region, as `(x, y)`
+        :param shape: the size of the region, in the form `(WIDTH, HEIGHT)`
+        """
+        return Region(self, position, shape)
+
     def clear(self):
         """Resets the sign so that all pixels are disabled"""
         self._comms.clear()
         self._state = np.full(self.shape, False, dtype=bool)
         self._current_state = np.full(self.shape, False, dtype=bool)
+        self._current_packed = None
         self._up_to_date = True
 
     def update(self, force: bool = False):
         """Updates the sign to match `state`"""
         if not self._up_to_date or force:
-            self._comms.update(self.state)
+            if self._mounting is Mounting.NORMAL:
+                self._comms.update(self.state)
+            else:
+                self._comms.update_packed(self._mount(pack_image(self.state)))
             self._current_state = self._state.copy()
+            self._current_packed = None
             self._up_to_date = True
 
+    def update_packed(
+        self, packed: np.ndarray, force: bool = False, packet: Optional[bytes] = None
+    ):
+        """
+        Updates the sign with an image that is already packed into the layout
+        sent to the sign (e.g. from `TextRenderer.packed_text`), rather than
+        `state`. The write is skipped if this image is already being shown
+
+        :param packet: the encoded packet for this image, if it has already
+                       been prepared (see `encode`)
+        """
+        if (
+            force
+            or self._current_packed is None
+            or not np.array_equal(packed, self._current_packed)
+        ):
+            if packet is None:
+                self._comms.update_packed(self._mount(packed))
+            else:
+                self._comms.write(packet)
+            self._current_packed = np.array(packed, dtype=np.uint8)
+            self._current_state = None
+            self._up_to_date = False
+
+    def encode(self, packed: np.ndarray) -> bytes:
+        """
+        Encodes the packet that shows a packed image on this sign, so that it
+        can be prepared ahead of time and passed to `update_packed` later
+        """
+        return self._comms.encode_packed(self._mount(packed))
+
+    def _mount(self, packed: np.ndarray) -> np.ndarray:
+        return mount(packed, self.shape[1], self._mounting)
+
+    def animate(self, frames: Iterable[np.ndarray]):
+        """
+        Shows a sequence of frames on the sign, one after another, as fast as
+        the frames are produced (e.g. by `TextRenderer.marquee`)
+        """
+        for frame in frames:
+            self.state = frame
+            self.update()
+
     def test_pattern(self):
         """
         Starts the test pattern sequence. This will run for 15 seconds on all
@@ -136,3 +238,89 @@ class Sign:
             output += "└" + "─" * (2 if wide else 1) * self.shape[0] + "┘"
 
         print(output)
+
+
+class Region:
+    """
+    A rectangular part of a sign, which can be drawn on as if it were a sign of
+    its own - e.g. to show a clock on one side of a sign and something else on
+    the other. Drawing on a region only changes the `state` of its sign: you
+    must call `Sign.update` to send it (see `flippy.compositor`)
+    """
+
+    def __init__(self, sign: Sign, position: tuple[int, int], shape: tuple[int, int]):
+        x, y = position
+        if (
+            x < 0
+            or y < 0
+            or x + shape[0] > sign.shape[0]
+            or y + shape[1] > sign.shape[1]
+        ):
+            raise ValueError("Region does not fit on the sign")
+        self._sign = sign
+        self._position = position
+        self._shape = shape
+
+    @property
+    def sign(self):
+        return self._sign
+
+    @property
+    def position(self):
+        """The top-left corner of the region on its sign, as `(x, y)`"""
+        return self._position
+
+    @property
+    def shape(self):
+        """The dimensions of the region in the form `(WIDTH, HEIGHT)`"""
+        return self._shape
+
+    @property
+    def state(self):
+        """The part of the sign's `state` covered by this region"""
+        x, y = self._position
+        return self._sign.state[x : x + self._shape[0], y : y + self._shape[1]]
+
+    @state.setter
+    def state(self, new_state: Optional[np.ndarray]):
+        if new_state is None:
+            self.clear()
+            return
+
+        if new_state.shape != self.shape:
+            raise ValueError(
+                "Incorrect Shape Provided! (%d x %d) instead of (%d x %d)",
+                *new_state.shape[0:2],
+                *self.shape,
+            )
+        self._sign.blit(new_state.astype(bool), self._position)
+
+    def overlaps(self, other: "Region") -> bool:
+        """Returns true if this region shares any pixels with another"""
+        return all(
+            a < b + b_size and b < a + a_size
+            for a, a_size, b, b_size in zip(
+                self._position, self._shape, other.position, other.shape
+            )
+        )
+
+    def blit(self, image: np.ndarray, position: tuple[int, int] = (0, 0)):
+        """
+        Draws an image onto part of the region (see `Sign.blit`). Anything that
+        falls outside of the region is clipped
+        """
+        x, y = position
+        x_start, y_start = max(x, 0), max(y, 0)
+        x_end = min(x + image.shape[0], self._shape[0])
+        y_end = min(y + image.shape[1], self._shape[1])
+        if x_start >= x_end or y_start >= y_end:
+            return
+
+        image = image[x_start - x : x_end - x, y_start - y : y_end - y]
+        self._sign.blit(
+            image, (self._position[0] + x_start, self._position[1] + y_start)
+        )
+
+    def clear(self):
+        """Disables every pixel in the region"""
+        self._sign.blit(np.zeros(self.shape, dtype=bool), self._position)
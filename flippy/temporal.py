@@ -0,0 +1,160 @@
+"""
+Temporal dithering: flip dots only have two states, but cycling quickly through
+a few frames can suggest shades of grey. A pixel that should be 25% bright is
+on for one frame in every four, and so on.
+
+Each pixel is on for one unbroken run of frames per cycle, which keeps the
+number of flips (and so the flicker) to a minimum. The runs start at different
+points for neighbouring pixels (using a Bayer matrix), so that each frame is
+roughly as bright as the others. Every frame of the cycle is encoded ahead of
+time, so playing it back is nothing but writes to the sign
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from time import monotonic, sleep
+from typing import Optional
+
+import numpy as np
+
+from flippy.comms import pack_image
+from flippy.images import bayer_matrix
+from flippy.sign import Sign
+
+logger = logging.getLogger("Temporal")
+
+
+@dataclass
+class DitherCycle:
+    """A cycle of frames that together show a greyscale image"""
+
+    frames: list[np.ndarray]  # packed frames (see `pack_image`)
+    packets: list[bytes]  # the encoded packet for each frame
+    holds: list[int]  # the number of frame slots to show each frame for
+    frame_time: float  # the time taken to write one frame, in seconds
+
+    @property
+    def length(self) -> int:
+        """The number of frame slots in one cycle"""
+        return sum(self.holds)
+
+    @property
+    def refresh_rate(self) -> float:
+        """The estimated number of cycles shown per second"""
+        return 1 / (self.length * self.frame_time)
+
+    @property
+    def bytes_per_cycle(self) -> int:
+        return sum(len(packet) for packet in self.packets)
+
+
+def temporal_dither(grey: np.ndarray, levels: int) -> np.ndarray:
+    """
+    Splits a greyscale image (with values from 0 to 1) into a cycle of 1-bit
+    frames, returned with the shape `(levels, WIDTH, HEIGHT)`
+    """
+    on_frames = np.rint(np.clip(grey, 0, 1) * levels).astype(int)
+
+    # stagger where each pixel's run of on-frames starts
+    size = 4
+    x = np.arange(grey.shape[0]) % size
+    y = np.arange(grey.shape[1]) % size
+    start = (bayer_matrix(size)[x[:, None], y[None, :]] * levels).astype(int)
+
+    frame = np.arange(levels)[:, None, None]
+    return (frame - start) % levels < on_frames
+
+
+def choose_levels(grey: np.ndarray, max_levels: int) -> int:
+    """
+    The shortest cycle that shows the image as well as a cycle of `max_levels`
+    frames would - e.g. an image that only uses black, white and 50% grey only
+    needs two frames
+    """
+    if max_levels <= 1:
+        return 1
+    on_frames = np.unique(np.rint(np.clip(grey, 0, 1) * max_levels).astype(int))
+    return max_levels // math.gcd(max_levels, *on_frames.tolist())
+
+
+def build_cycle(
+    sign: Sign,
+    grey: np.ndarray,
+    max_period: float = 2,
+    max_levels: int = 8,
+    frame_time: Optional[float] = None,
+) -> DitherCycle:
+    """
+    Builds (and encodes) the cycle of frames to show a greyscale image
+
+    :param grey: the image, with values from 0 to 1 (see `images.greyscale`)
+    :param max_period: the longest a cycle can take, in seconds. More levels of
+                       grey need longer cycles, which flicker more visibly
+    :param max_levels: the most shades of grey to use (apart from black)
+    :param frame_time: the time taken to write one frame, if it has been
+                       measured - otherwise, this is estimated from the baud rate
+    """
+    if frame_time is None:
+        blank = pack_image(np.zeros(sign.shape, dtype=bool))
+        frame_time = sign.comms.write_time(sign.encode(blank))
+
+    budget = max(1, min(max_levels, int(max_period / frame_time)))
+    if budget < 2:
+        logger.warning(
+            "Writing a frame takes %.2fs, so no shades of grey fit into %.2fs",
+            frame_time,
+            max_period,
+        )
+    levels = choose_levels(grey, budget)
+    frames = pack_image(temporal_dither(grey, levels))
+
+    # frames that match the one before can be held, rather than sent again
+    packed, holds = [], []
+    for frame in frames:
+        if packed and np.array_equal(frame, packed[-1]):
+            holds[-1] += 1
+        else:
+            packed.append(frame)
+            holds.append(1)
+    if len(packed) > 1 and np.array_equal(packed[0], packed[-1]):
+        holds[0] += holds.pop()
+        packed.pop()
+
+    return DitherCycle(
+        frames=packed,
+        packets=[sign.encode(frame) for frame in packed],
+        holds=holds,
+        frame_time=frame_time,
+    )
+
+
+def play_cycle(sign: Sign, cycle: DitherCycle, duration: Optional[float] = None):
+    """
+    Plays a cycle on the sign, for `duration` seconds (or until interrupted)
+
+    :returns: the number of cycles shown per second
+    """
+    start = next_frame = monotonic()
+    cycles = 0
+    try:
+        while duration is None or monotonic() - start < duration:
+            for frame, packet, hold in zip(cycle.frames, cycle.packets, cycle.holds):
+                sign.update_packed(frame, packet=packet)
+                next_frame += hold * cycle.frame_time
+                if (delay := next_frame - monotonic()) > 0:
+                    sleep(delay)
+            cycles += 1
+    except KeyboardInterrupt:
+        pass
+
+    elapsed = monotonic() - start
+    refresh_rate = cycles / elapsed if elapsed > 0 else 0
+    logger.info(
+        "Showed %d cycles of %d frames in %.1fs (%.2f cycles per second)",
+        cycles,
+        cycle.length,
+        elapsed,
+        refresh_rate,
+    )
+    return refresh_rate
@@ -2,18 +2,35 @@
 This class contains adapter functions (`BinaryFont` and `BitmapFont`) to allow
 font files from other sources (SSD1306ASCII and Minecraft/similar games
 respectively as a source of text
+
+Fonts can also be compiled into a compact binary format (`CompiledFont`), which
+can be memory-mapped to load quickly. The bundled fonts (`MINECRAFT`,
+`ADAFRUIT_5X7`, etc.) are built on first access, and cached in this format
+
+Several fonts can be combined with a `FontStack`, which falls back to later
+fonts (and then to transliteration) for characters the first font is missing
 """
 
+import functools
+import hashlib
+import logging
+import mmap
+import os
 import pathlib
+import string
+import struct
 from abc import abstractmethod
+from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from threading import Lock
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional
 
 import numpy as np
-from PIL import Image
 
-from flippy.font_data import ADAFRUIT_5X7_DATA, NEWBASIC_3X5_DATA, WENDY_3X5_DATA
+if TYPE_CHECKING:
+    from flippy.sign import Sign
 
 
 class Font:
@@ -26,6 +43,7 @@ class Font:
         self._offset = offset
         self._num_chars = num_chars
         self._space_width = space_width
+        self._fingerprint: Optional[str] = None
 
     @property
     def num_chars(self):
@@ -37,6 +55,27 @@ class Font:
         """Returns the height of the font in pixels"""
         return self._height
 
+    @property
+    def codepoints(self) -> range:
+        """Returns the range of character codes that the font has data for"""
+        return range(self._offset, self._offset + self._num_chars)
+
+    def has_glyph(self, character) -> bool:
+        """Returns true if the font has a glyph for a particular character"""
+        return ord(character) in self.codepoints
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        A hash of every glyph in the font, which changes whenever the font does
+        (e.g. to key caches of text that has been rendered in it)
+        """
+        # fonts don't change once they are loaded, so this is only worked out
+        #  (by compiling the font) once
+        if self._fingerprint is None:
+            self._fingerprint = compile_font(self).fingerprint
+        return self._fingerprint
+
     @abstractmethod
     def char(self, character):
         """Outputs the font data for a particular character as a numpy array"""
@@ -49,15 +88,10 @@ class Font:
         """
         output = []
         for i, char in enumerate(string):
-            if ord(char) < 256:
-                try:
-                    representation = self.char(char)
-                except ValueError:
-                    if not ignore_errors:
-                        raise
-                    else:
-                        continue
-                output.extend(representation)
+            if self.has_glyph(char):
+                output.extend(self.char(char))
+            elif ord(char) < 256 and not ignore_errors:
+                raise ValueError(f"Error: invalid char '{char}'!")
 
             if i != len(string) - 1:  # do not output a gap after the last character
                 # a one-pixel horizontal between letters
@@ -99,6 +133,10 @@ class BinaryFont(Font):
         self._font_data = font_data
         self._kern = kern
 
+    def has_glyph(self, character) -> bool:
+        # beyond ASCII, the glyphs follow code page 437 rather than unicode
+        return ord(character) < 128 and super().has_glyph(character)
+
     def char(self, character):
         """Font data for a particular character"""
         if ord(character) - self._offset > self.num_chars:
@@ -173,6 +211,9 @@ class BitmapFont(Font):
     def __init__(
         self, path: Path, size: int = 8, space_width: int = 2, kern: bool = True
     ):
+        # imported here, so that PIL is only loaded when it is actually needed
+        from PIL import Image
+
         self._size = size
         self._bitmap = Image.open(path)
 
@@ -187,6 +228,10 @@ class BitmapFont(Font):
         )
         self._kern = kern
 
+    def has_glyph(self, character) -> bool:
+        # beyond ASCII, the glyphs follow code page 437 rather than unicode
+        return ord(character) < 128 and super().has_glyph(character)
+
     def char(self, character):
         """Font data for a particular character"""
         if ord(character) - self._offset > self.num_chars:
@@ -227,17 +272,560 @@ class BitmapFont(Font):
         return np.array(pixel_rows).T
 
 
+class CompiledFont(Font):
+    """
+    Fonts stored in a compact binary format, which can be loaded without any
+    parsing (see `compile_font` to create them). The file consists of:
+     - a header: magic bytes, format version, font height and glyph count
+     - the character code of each glyph (as little-endian uint32s)
+     - the width of each glyph (as uint8s)
+     - the glyph bitmaps, packed one column at a time with `ceil(height / 8)`
+       bytes per column (least significant bit at the top)
+    """
+
+    MAGIC = b"FLPF"
+    VERSION = 2
+    _HEADER = struct.Struct("<4sBBxxI")
+
+    def __init__(self, data: bytes | mmap.mmap):
+        magic, version, height, count = self._HEADER.unpack_from(data)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("Not a compiled font (or an incompatible version)")
+        super().__init__(height, count)
+
+        # keep a reference to the data, as the arrays below are views into it
+        self._data = data
+        offset = self._HEADER.size
+        self._codepoints = np.frombuffer(data, dtype="<u4", count=count, offset=offset)
+        offset += 4 * count
+        self._widths = np.frombuffer(data, dtype=np.uint8, count=count, offset=offset)
+        offset += count
+
+        self._bytes_per_column = -(-height // 8)
+        self._columns = np.frombuffer(data, dtype=np.uint8, offset=offset).reshape(
+            -1, self._bytes_per_column
+        )
+        self._starts = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(self._widths, out=self._starts[1:])
+        self._index = dict(zip(self._codepoints.tolist(), range(count)))
+        self._column_values: Optional[np.ndarray] = None
+
+    @classmethod
+    def load(cls, path: Path) -> "CompiledFont":
+        """Memory-maps a compiled font file"""
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @property
+    def codepoints(self) -> np.ndarray:
+        return self._codepoints
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = hashlib.sha1(self._data).hexdigest()
+        return self._fingerprint
+
+    def has_glyph(self, character) -> bool:
+        return ord(character) in self._index
+
+    def char(self, character):
+        """Font data for a particular character"""
+        glyph = self._index.get(ord(character))
+        if glyph is None:
+            raise ValueError(f"Error: invalid char '{character}'!")
+
+        columns = self._columns[self._starts[glyph] : self._starts[glyph + 1]]
+        return np.unpackbits(columns, axis=1, count=self.height, bitorder="little")
+
+    def packed_char(self, character) -> np.ndarray:
+        """
+        Font data for a particular character, in the packed column-byte layout
+        used by the sign (see `flippy.comms.pack_image`)
+        """
+        glyph = self._index.get(ord(character))
+        if glyph is None:
+            raise ValueError(f"Error: invalid char '{character}'!")
+        return self._columns[self._starts[glyph] : self._starts[glyph + 1]]
+
+    @property
+    def column_values(self) -> np.ndarray:
+        """
+        Every column of every glyph as a single integer (with bit `n` set if
+        row `n` is filled), after one empty column used for gaps
+        """
+        if self._column_values is None:
+            if self._bytes_per_column > 8:
+                raise ValueError("Only fonts up to 64px tall can be packed")
+            padded = np.zeros((self._columns.shape[0] + 1, 8), dtype=np.uint8)
+            padded[1:, : self._bytes_per_column] = self._columns
+            self._column_values = padded.view("<u8").ravel()
+        return self._column_values
+
+    def column_sources(self, string: str, ignore_errors: bool = False) -> np.ndarray:
+        """
+        For each column of a rendered string, the index of the column in
+        `column_values` it comes from (the first, empty, column for gaps)
+        """
+        glyphs = np.empty(len(string), dtype=np.int64)
+        for i, char in enumerate(string):
+            glyph = self._index.get(ord(char))
+            if glyph is None:
+                # characters outside of the font are skipped, the same as
+                #  `string` does for characters beyond the 8-bit range
+                if ord(char) < 256 and not ignore_errors:
+                    raise ValueError(f"Error: invalid char '{char}'!")
+                glyph = -1
+            glyphs[i] = glyph
+
+        return _column_sources(glyphs, self._widths, self._starts + 1)
+
+    def string_columns(self, string: str, ignore_errors: bool = False) -> np.ndarray:
+        """
+        The equivalent of `string`, but producing a packed integer for each
+        column (see `column_values`) rather than an array of pixels
+        """
+        return self.column_values[self.column_sources(string, ignore_errors)]
+
+
+def _column_sources(
+    glyphs: np.ndarray, glyph_widths: np.ndarray, glyph_starts: np.ndarray
+) -> np.ndarray:
+    """
+    Works out which column of a font each column of a rendered string comes
+    from, given the glyph for each character (or -1 to skip the character), and
+    where each glyph starts. Column 0 is used for the gaps between characters
+    """
+    # each character is followed by a one-pixel gap, except the last one
+    widths = np.where(glyphs >= 0, glyph_widths[glyphs], 0).astype(np.int64)
+    lengths = widths + 1
+    lengths[-1:] -= 1
+
+    owners = np.repeat(np.arange(len(glyphs)), lengths)
+    within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.where(within < widths[owners], glyph_starts[glyphs[owners]] + within, 0)
+
+
+@functools.lru_cache(maxsize=None)
+def transliterate(character: str) -> str:
+    """Converts a character into the closest ASCII equivalent (e.g. 'é' to 'e')"""
+    # imported here, as it is only needed for text outside of ASCII
+    from unidecode import unidecode
+
+    return unidecode(character)
+
+
+class FontStack(Font):
+    """
+    A list of fonts, where each character is drawn using the first font that
+    has a glyph for it. If none of them do, the character is transliterated to
+    ASCII and looked up again. Glyphs are found once per character, and then
+    stored in a sparse index by character code, so each lookup is O(1)
+
+    Every glyph is drawn at the height of the first font - glyphs from other
+    fonts are aligned to the top, and cropped or padded to fit
+    """
+
+    def __init__(self, *fonts: Font, use_transliteration: bool = True):
+        if len(fonts) == 0:
+            raise ValueError("A font stack needs at least one font")
+        super().__init__(fonts[0].height, 0)
+        self._fonts = fonts
+        self._use_transliteration = use_transliteration
+
+        self._lock = Lock()
+        self._index: dict[int, int] = {}  # character code -> glyph (-1 for none)
+        self._glyphs: list[np.ndarray] = []
+        self._glyph_columns: list[np.ndarray] = []
+        self._packed: Optional[tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    @property
+    def fonts(self) -> tuple[Font, ...]:
+        return self._fonts
+
+    @property
+    def fingerprint(self) -> str:
+        key = hashlib.sha1(f"stack:{self._use_transliteration}".encode())
+        for font in self._fonts:
+            key.update(font.fingerprint.encode())
+        return key.hexdigest()
+
+    @property
+    def num_chars(self):
+        return len(self._glyphs)
+
+    @property
+    def codepoints(self) -> list[int]:
+        """The character codes that have been looked up, and have a glyph"""
+        return sorted(code for code, glyph in self._index.items() if glyph >= 0)
+
+    def _fit(self, font: Font, character: str) -> np.ndarray:
+        pixels = np.array(font.char(character), dtype=bool).reshape(-1, font.height)
+        fitted = np.zeros((pixels.shape[0], self.height), dtype=bool)
+        rows = min(font.height, self.height)
+        fitted[:, :rows] = pixels[:, :rows]
+        return fitted
+
+    def _lookup(self, character: str) -> Optional[np.ndarray]:
+        for font in self._fonts:
+            if font.has_glyph(character):
+                return self._fit(font, character)
+
+        if self._use_transliteration:
+            replacement = transliterate(character)
+            if replacement != character:
+                # replacements can be several characters long (e.g. 'æ' to 'ae')
+                parts = [self._lookup(char) for char in replacement]
+                parts = [part for part in parts if part is not None]
+                if parts:
+                    gap = np.zeros((1, self.height), dtype=bool)
+                    joined = [parts[0]]
+                    for part in parts[1:]:
+                        joined.extend((gap, part))
+                    return np.concatenate(joined)
+
+        return None
+
+    def _glyph(self, character: str) -> int:
+        """The index of the glyph for a character, finding it if necessary"""
+        glyph = self._index.get(ord(character))
+        if glyph is None:
+            with self._lock:
+                pixels = self._lookup(character)
+                if pixels is None:
+                    glyph = -1
+                else:
+                    glyph = len(self._glyphs)
+                    self._glyphs.append(pixels)
+                    packed = np.zeros((pixels.shape[0], 8), dtype=np.uint8)
+                    packed[:, : -(-self.height // 8)] = np.packbits(
+                        pixels, axis=1, bitorder="little"
+                    )
+                    self._glyph_columns.append(packed.view("<u8").ravel())
+                    self._packed = None
+                self._index[ord(character)] = glyph
+        return glyph
+
+    def has_glyph(self, character) -> bool:
+        return self._glyph(character) >= 0
+
+    def char(self, character):
+        """Font data for a particular character"""
+        glyph = self._glyph(character)
+        if glyph < 0:
+            raise ValueError(f"Error: invalid char '{character}'!")
+        return self._glyphs[glyph]
+
+    def _packed_glyphs(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # the packed columns are rebuilt whenever new glyphs are found, which
+        #  stops happening once the characters in use have all been seen
+        packed = self._packed
+        if packed is None:
+            if self.height > 64:
+                raise ValueError("Only fonts up to 64px tall can be packed")
+            # glyphs can be found on other threads while this is built
+            with self._lock:
+                packed = self._packed
+                if packed is None:
+                    widths = np.array(
+                        [len(glyph) for glyph in self._glyphs], dtype=np.int64
+                    )
+                    starts = np.ones(len(widths) + 1, dtype=np.int64)
+                    np.cumsum(widths, out=starts[1:])
+                    starts[1:] += 1
+                    values = np.concatenate(
+                        [np.zeros(1, dtype="<u8"), *self._glyph_columns]
+                    )
+                    packed = self._packed = (values, widths, starts)
+        return packed
+
+    @property
+    def column_values(self) -> np.ndarray:
+        """The same as `CompiledFont.column_values`, for the glyphs found so far"""
+        return self._packed_glyphs()[0]
+
+    def column_sources(self, string: str, ignore_errors: bool = False) -> np.ndarray:
+        """The same as `CompiledFont.column_sources`"""
+        glyphs = np.empty(len(string), dtype=np.int64)
+        for i, char in enumerate(string):
+            glyphs[i] = self._glyph(char)
+            if glyphs[i] < 0 and ord(char) < 256 and not ignore_errors:
+                raise ValueError(f"Error: invalid char '{char}'!")
+
+        _, widths, starts = self._packed_glyphs()
+        return _column_sources(glyphs, widths, starts)
+
+    def string_columns(self, string: str, ignore_errors: bool = False) -> np.ndarray:
+        """The same as `CompiledFont.string_columns`"""
+        sources = self.column_sources(string, ignore_errors)
+        return self.column_values[sources]
+
+
+def font_cache_dir() -> Path:
+    """The directory compiled fonts are cached in"""
+    return Path(
+        os.environ.get("FLIPPY_FONT_CACHE", Path.home().joinpath(".cache", "flippy"))
+    )
+
+
+def _pack_font(height: int, glyphs: Iterable[tuple[int, np.ndarray]]) -> bytes:
+    """Packs `(character code, pixels)` pairs into the `CompiledFont` format"""
+    codepoints, widths, columns = [], [], []
+    for code, representation in glyphs:
+        representation = np.asarray(representation, dtype=bool).reshape(-1, height)
+        codepoints.append(code)
+        widths.append(representation.shape[0])
+        columns.append(np.packbits(representation, axis=1, bitorder="little"))
+
+    data = CompiledFont._HEADER.pack(
+        CompiledFont.MAGIC, CompiledFont.VERSION, height, len(codepoints)
+    )
+    data += np.array(codepoints, dtype="<u4").tobytes()
+    data += np.array(widths, dtype=np.uint8).tobytes()
+    for column in columns:
+        data += column.tobytes()
+    return data
+
+
+def _write_font(path: Path, data: bytes):
+    # write to a temporary file first, so other processes never see half a font
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temporary_path.write_bytes(data)
+    os.replace(temporary_path, path)
+
+
+def compile_font(font: Font, path: Optional[Path] = None) -> CompiledFont:
+    """
+    Converts any font (e.g. a `BinaryFont` or `BitmapFont`) into a
+    `CompiledFont`. If a path is given, the compiled font is also written to it
+    """
+
+    def glyphs():
+        for code in font.codepoints:
+            if not font.has_glyph(chr(code)):
+                continue
+            try:
+                yield code, font.char(chr(code))
+            except ValueError:
+                continue
+
+    data = _pack_font(font.height, glyphs())
+    if path is None:
+        return CompiledFont(data)
+
+    _write_font(path, data)
+    return CompiledFont.load(path)
+
+
+class TrueTypeFont(CompiledFont):
+    """
+    Fonts rasterised from TrueType/OpenType files (using PIL). Rasterising is
+    slow, so the result is cached on disk as a compiled font, named after a
+    hash of the font file and the options used - later runs just load that
+    """
+
+    DEFAULT_CHARACTERS = "".join(map(chr, [*range(32, 127), *range(160, 256)]))
+
+    def __init__(
+        self,
+        path: Path,
+        height: int,
+        size: Optional[int] = None,
+        baseline: Optional[int] = None,
+        threshold: int = 128,
+        hinting: bool = True,
+        kern: bool = True,
+        space_width: Optional[int] = None,
+        characters: str = DEFAULT_CHARACTERS,
+        cache_dir: Optional[Path] = None,
+    ):
+        """
+        :param path: the font file to use
+        :param height: the height of the font, in pixels
+        :param size: the size to render the font at (defaults to `height`)
+        :param baseline: the row of pixels the baseline of the text sits on
+                         (defaults to a row in proportion to the font's ascent
+                         and descent)
+        :param threshold: the brightness (0-255) at which a pixel is counted as
+                          filled, when rendering with anti-aliasing
+        :param hinting: whether to render with FreeType's monochrome hinting,
+                        rather than rendering with anti-aliasing and applying
+                        `threshold`
+        :param kern: whether to trim empty columns from each side of a glyph,
+                     rather than using the width given by the font
+        :param space_width: the width of a space (defaults to the font's)
+        :param characters: the characters to include in the font
+        """
+        path = Path(path)
+        options = dict(
+            height=height,
+            size=size,
+            baseline=baseline,
+            threshold=threshold,
+            hinting=hinting,
+            kern=kern,
+            space_width=space_width,
+            characters=characters,
+        )
+        key = hashlib.sha1(path.read_bytes())
+        key.update(repr((CompiledFont.VERSION, sorted(options.items()))).encode())
+
+        cache_path = (cache_dir or font_cache_dir()).joinpath(
+            f"{path.stem.lower()}-{height}px-{key.hexdigest()[:16]}.fnt"
+        )
+        if not cache_path.exists():
+            glyphs = self._rasterise(path, **options)
+            try:
+                _write_font(cache_path, _pack_font(height, glyphs))
+            except OSError:
+                logging.getLogger("Fonts").warning(
+                    "Unable to cache font %s", path, exc_info=True
+                )
+                super().__init__(_pack_font(height, glyphs))
+                return
+
+        with open(cache_path, "rb") as f:
+            super().__init__(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @staticmethod
+    def _rasterise(
+        path: Path,
+        height: int,
+        size: Optional[int],
+        baseline: Optional[int],
+        threshold: int,
+        hinting: bool,
+        kern: bool,
+        space_width: Optional[int],
+        characters: str,
+    ) -> list[tuple[int, np.ndarray]]:
+        # imported here, so that PIL is only loaded when it is actually needed
+        from PIL import Image, ImageDraw, ImageFont
+
+        font = ImageFont.truetype(str(path), size or height)
+        ascent, descent = font.getmetrics()
+        if baseline is None:
+            baseline = round(height * ascent / (ascent + descent))
+
+        glyphs = []
+        for character in dict.fromkeys(characters):
+            if character == " ":
+                width = (
+                    round(font.getlength(" ")) if space_width is None else space_width
+                )
+                glyphs.append((ord(" "), np.zeros((width, height), dtype=bool)))
+                continue
+
+            left, _, right, _ = font.getbbox(character, anchor="ls")
+            if kern:
+                x, width = -left, right - left
+            else:
+                x, width = 0, max(right, round(font.getlength(character)))
+
+            image = Image.new("L", (max(width, 1), height))
+            draw = ImageDraw.Draw(image)
+            draw.fontmode = "1" if hinting else "L"
+            draw.text((x, baseline), character, font=font, fill=255, anchor="ls")
+            pixels = (np.array(image) >= threshold).T[:width]
+
+            if kern:
+                filled = np.flatnonzero(pixels.any(axis=1))
+                pixels = (
+                    pixels[filled[0] : filled[-1] + 1] if len(filled) else pixels[:0]
+                )
+
+            glyphs.append((ord(character), pixels))
+
+        return glyphs
+
+
+class FontRegistry:
+    """
+    A collection of named fonts, which are only built when they are first
+    used. Built fonts are compiled and cached on disk, so later runs can simply
+    memory-map them rather than building them again
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self._cache_dir = cache_dir or font_cache_dir()
+        self._logger = logging.getLogger("Fonts")
+        self._factories: dict[str, tuple[Callable[[], Font], tuple[Path, ...]]] = {}
+        self._fonts: dict[str, Optional[Font]] = {}
+        self._lock = Lock()
+
+    def __contains__(self, name: str):
+        return name in self._factories
+
+    def __iter__(self):
+        return iter(self._factories)
+
+    def register(self, name: str, factory: Callable[[], Font], sources: tuple = ()):
+        """
+        Adds a font to the registry
+
+        :param name: the name of the font
+        :param factory: a function to build the font
+        :param sources: the files the font is built from - if these change, the
+                        font is rebuilt. If any are missing, the font is `None`
+        """
+        self._factories[name] = (factory, tuple(Path(source) for source in sources))
+        self._fonts.pop(name, None)
+
+    def get(self, name: str) -> Optional[Font]:
+        """Returns a font by name, building it if it has not been used yet"""
+        with self._lock:
+            if name not in self._fonts:
+                self._fonts[name] = self._load(name)
+            return self._fonts[name]
+
+    def _cache_path(self, name: str, sources: tuple[Path, ...]) -> Path:
+        key = hashlib.sha1(f"{name}:{CompiledFont.VERSION}".encode())
+        for source in sources:
+            stat = source.stat()
+            key.update(
+                f":{source.resolve()}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+            )
+        return self._cache_dir.joinpath(f"{name.lower()}-{key.hexdigest()[:16]}.fnt")
+
+    def _load(self, name: str) -> Optional[Font]:
+        factory, sources = self._factories[name]
+        if not all(source.exists() for source in sources):
+            return None
+
+        path = self._cache_path(name, sources)
+        if path.exists():
+            try:
+                return CompiledFont.load(path)
+            except (OSError, ValueError, struct.error):
+                self._logger.warning("Compiled font %s is invalid, rebuilding", path)
+
+        self._logger.debug("Building font %s", name)
+        font = factory()
+        try:
+            return compile_font(font, path)
+        except OSError:
+            self._logger.warning("Unable to cache font %s", name, exc_info=True)
+            return compile_font(font)
+
+
 class TextAlign(Enum):
     LEFT = 0
     RIGHT = 1
     CENTRE = 2
 
 
+class TextLayout(Enum):
+    GREEDY = 0  # fit as many words as possible onto each line
+    OPTIMAL = 1  # balance the lines, avoiding mostly-empty screens
+
+
 class TextRenderer:
     def __init__(self, font: Font, shape: tuple[int, int]):
         self._font = font
         self._shape = shape
         self._lines = self.shape[1] // font.height
+        self._packed_fonts: dict[Font, CompiledFont | FontStack] = {}
 
     @property
     def font(self):
@@ -247,6 +835,37 @@ class TextRenderer:
     def shape(self):
         return self._shape
 
+    @property
+    def packed_font(self) -> CompiledFont | FontStack:
+        """
+        The font in a form that can render straight into packed columns - fonts
+        other than `CompiledFont` and `FontStack` are compiled to get this
+        """
+        return self._packed(self._font)
+
+    def _packed(self, font: Font) -> CompiledFont | FontStack:
+        if font not in self._packed_fonts:
+            if isinstance(font, (CompiledFont, FontStack)):
+                self._packed_fonts[font] = font
+            else:
+                self._packed_fonts[font] = compile_font(font)
+        return self._packed_fonts[font]
+
+    def _to_packed(self, columns: np.ndarray) -> np.ndarray:
+        """Converts packed integer columns into the layout sent to the sign"""
+        # each column is a little-endian integer, so the bytes we need are the
+        #  first few bytes of each one
+        bytes_per_column = -(-self.shape[1] // 8)
+        columns = columns.astype("<u8") & np.uint64((1 << self.shape[1]) - 1)
+        return np.ascontiguousarray(
+            columns.view(np.uint8).reshape(*columns.shape, 8)[..., :bytes_per_column]
+        )
+
+    def _to_pixels(self, columns: np.ndarray) -> np.ndarray:
+        """Converts packed integer columns into an array of pixels"""
+        rows = np.arange(self.shape[1], dtype=np.uint64)
+        return ((columns[..., None] >> rows) & np.uint64(1)).astype(bool)
+
     def text(
         self,
         text: str,
@@ -284,106 +903,568 @@ class TextRenderer:
 
         return screen
 
-    def long_text(
-        self, text: str, align: TextAlign = TextAlign.CENTRE, allow_clip: bool = True
-    ) -> list[tuple[Optional[np.ndarray], str]]:
-        """Splits a long message into multiple screens of text"""
+    def packed_text(
+        self,
+        text: str,
+        align: TextAlign = TextAlign.CENTRE,
+        line: int = 0,
+        allow_clip: bool = False,
+    ) -> np.ndarray:
+        """
+        Renders a single screen of text, the same as `text`, but straight into
+        the packed column-byte layout sent to the sign (see
+        `flippy.comms.pack_image`). This is much faster, as the glyphs are
+        stored in the same layout, so they never need to be unpacked
+        """
+        width, height = self.shape
+        if height > 64:
+            raise ValueError("Only screens up to 64px tall can be packed")
+
+        frame = np.zeros(width, dtype="<u8")
+        if text != "":
+            columns = self.packed_font.string_columns(text)
+            if not allow_clip and len(columns) > width:
+                raise ValueError(f"Text '{text}' cannot fit on screen")
+
+            if line >= self._lines:
+                raise ValueError("Invalid Line Selected")
+
+            columns = columns[:width]
+            if align is TextAlign.LEFT:
+                start = 0
+            elif align is TextAlign.RIGHT:
+                start = width - len(columns)
+            elif align is TextAlign.CENTRE:
+                start = (width - len(columns)) // 2
+            else:
+                raise ValueError("Unknown Alignment")
+
+            frame[start : start + len(columns)] = columns << np.uint64(
+                line * self._font.height
+            )
+
+        return self._to_packed(frame)
+
+    def rich_text(
+        self, spans: Iterable["TextSpan"], allow_clip: bool = False, packed=False
+    ) -> np.ndarray:
+        """
+        Renders a single screen made up of several runs of text, each of which
+        can have its own font, alignment, line and offset. Every span is drawn
+        into the same buffer, in one pass, with later spans drawn over the top
+        of earlier ones
+
+        :param spans: the runs of text to draw
+        :param allow_clip: whether spans are allowed to run off the screen
+        :param packed: whether to return the screen in the packed layout sent
+                       to the sign (see `packed_text`), rather than as pixels
+        """
+        width, height = self.shape
+        if height > 64:
+            raise ValueError("Only screens up to 64px tall can be packed")
+
+        frame = np.zeros(width, dtype=np.uint64)
+        for span in spans:
+            if span.text == "":
+                continue
+            font = span.font or self._font
+            columns = self._packed(font).string_columns(span.text)
+            if not allow_clip and len(columns) > width:
+                raise ValueError(f"Text '{span.text}' cannot fit on screen")
+
+            if span.line >= height // font.height:
+                raise ValueError("Invalid Line Selected")
+
+            if span.align is TextAlign.LEFT:
+                start = 0
+            elif span.align is TextAlign.RIGHT:
+                start = width - min(len(columns), width)
+            elif span.align is TextAlign.CENTRE:
+                start = (width - min(len(columns), width)) // 2
+            else:
+                raise ValueError("Unknown Alignment")
+
+            # move the span into place, then clip it to the edges of the screen
+            start += span.offset[0]
+            y = span.line * font.height + span.offset[1]
+            if y + font.height > 64:
+                # the rows below the 64th would be lost from the packed columns
+                raise ValueError("Only spans within the top 64px can be packed")
+            if y <= -font.height:
+                continue  # entirely above the screen
+            columns = columns[max(0, -start) : max(0, width - start)]
+            start = max(0, start)
+            if y >= 0:
+                columns = columns << np.uint64(y)
+            else:
+                columns = columns >> np.uint64(-y)
+            frame[start : start + len(columns)] |= columns
+
+        return self._to_packed(frame) if packed else self._to_pixels(frame)
+
+    def _wrap(self, text: str, layout: TextLayout = TextLayout.GREEDY) -> list[str]:
+        """Splits text into lines that fit on the screen (see `TextLayout`)"""
         words = text.strip().split(" ")
-        if len(words) == 0:
-            return []
 
-        output = []
-        counter = 0
-        while counter < len(words):
-            added_words = [words[counter]]
-            while text_fits := (
-                self._font.string(" ".join(added_words)).shape[0] <= self.shape[0]
+        # the width of a string is the width of each character plus a one-pixel
+        #  gap after each of them, minus the gap after the final character
+        def advance(string):
+            return len(self.packed_font.column_sources(string)) + 1 if string else 0
+
+        advances = [advance(word) for word in words]
+        space = advance(" ")
+
+        if layout is TextLayout.OPTIMAL:
+            return self._wrap_optimal(words, advances, space)
+
+        lines = []
+        start = 0
+        while start < len(words):
+            end = start + 1
+            line_advance = advances[start]
+            while (
+                end < len(words)
+                and line_advance + space + advances[end] - 1 <= self.shape[0]
             ):
-                if counter + len(added_words) == len(words):
-                    break
+                line_advance += space + advances[end]
+                end += 1
 
-                added_words.append(words[counter + len(added_words)])
+            lines.append(" ".join(words[start:end]))
+            start = end
 
-            if not text_fits and len(added_words) > 1:
-                added_words.pop()
+        return lines
 
-            if len(added_words) == 0:
-                output.append((None, ""))
-            else:
-                counter += len(added_words)
-                screen_words = " ".join(added_words)
-                output.append(
-                    (
-                        self.text(screen_words, align, allow_clip=allow_clip),
-                        screen_words,
-                    )
-                )
+    def _wrap_optimal(
+        self, words: list[str], advances: list[int], space: int
+    ) -> list[str]:
+        """
+        Splits words into lines using dynamic programming (in the style of
+        Knuth-Plass), choosing the split with the fewest screens and, of those,
+        the least ragged lines. Raggedness is the sum of the squared space left
+        at the end of each line, with unused lines on the final screen counting
+        as entirely empty - so a final screen with a single word on it is
+        avoided wherever there is a better balanced option
+        """
+        width = self.shape[0]
+        lines_per_screen = max(self._lines, 1)
+
+        # best[i][r] is the best way of fitting the first i words, such that the
+        #  next line is line r of a screen: (screens, raggedness, previous i, r)
+        best: list[list[Optional[tuple]]] = [
+            [None] * lines_per_screen for _ in range(len(words) + 1)
+        ]
+        best[0][0] = (0, 0, None, None)
+        for start in range(len(words)):
+            for line in range(lines_per_screen):
+                if best[start][line] is None:
+                    continue
+                screens, raggedness, _, _ = best[start][line]
+                if line == 0:
+                    screens += 1
+
+                next_line = (line + 1) % lines_per_screen
+                line_advance = -space
+                for end in range(start + 1, len(words) + 1):
+                    line_advance += space + advances[end - 1]
+                    if line_advance - 1 > width and end > start + 1:
+                        break
+
+                    slack = max(width - (line_advance - 1), 0)
+                    candidate = (screens, raggedness + slack * slack, start, line)
+                    current = best[end][next_line]
+                    if current is None or candidate[:2] < current[:2]:
+                        best[end][next_line] = candidate
+
+        # count any unused lines on the final screen as empty
+        end_line = min(
+            (line for line in range(lines_per_screen) if best[-1][line] is not None),
+            key=lambda line: (
+                best[-1][line][0],
+                best[-1][line][1]
+                + ((lines_per_screen - line) % lines_per_screen) * width * width,
+            ),
+        )
 
-        # multiline support
-        if self._lines > 1:
-            multiline_output = []
-            line_index = 0
-            screen_state = None
-            screen_text = None
+        lines = []
+        end = len(words)
+        while end > 0:
+            _, _, start, end_line = best[end][end_line]
+            lines.append(" ".join(words[start:end]))
+            end = start
+        return lines[::-1]
 
-            for _, words in output:
-                if line_index == 0:
-                    multiline_output.append((screen_state, screen_text))
+    def batch_text(
+        self,
+        texts: Iterable[str],
+        align: TextAlign = TextAlign.CENTRE,
+        allow_clip: bool = True,
+        layout: TextLayout = TextLayout.GREEDY,
+    ) -> tuple[np.ndarray, list[tuple[int, str]]]:
+        """
+        Splits many messages into screens of text at once, in the same way as
+        `long_text`. Rather than drawing each screen separately, the columns of
+        every screen are gathered from the compiled font in one go
 
-                    screen_state = self.text(
-                        words, align, allow_clip=allow_clip, line=line_index
-                    )
-                    screen_text = words
-                else:
-                    screen_state += self.text(
-                        words, align, allow_clip=allow_clip, line=line_index
-                    )
-                    screen_text += " " + words
-
-                line_index = (line_index + 1) % self._lines
-
-            # add the final line
-            if line_index != 0:
-                # we have not fully filled the screen, vertically align the text too
-                blank_line_count = self._lines - line_index
-                filled_height = line_index * self._font.height
-                blank_pixel_count = (blank_line_count * self._font.height) // 2
-                aligned_text = np.zeros(self.shape, dtype=bool)
-                aligned_text[
-                    :, blank_pixel_count : blank_pixel_count + filled_height
-                ] = screen_state[:, :filled_height]
-                multiline_output.append((aligned_text, screen_text))
+        :returns: every screen, as one array of shape `(N, WIDTH, HEIGHT)`, and
+                  for each screen the index of the message it belongs to and
+                  the text shown on it
+        """
+        width, height = self.shape
+        if height > 64:
+            raise ValueError("Only screens up to 64px tall can be batched")
+
+        # lay out each message, and find where every line of text goes
+        pages = []
+        placements = []  # (screen index, text, y position) for each line
+        lines_per_screen = max(self._lines, 1)
+        for index, text in enumerate(texts):
+            lines = self._wrap(text, layout)
+            for start in range(0, len(lines), lines_per_screen):
+                screen_lines = lines[start : start + lines_per_screen]
+                y = 0
+                if self._lines > 1 and len(screen_lines) < self._lines:
+                    # we have not fully filled the screen, vertically align it
+                    y = ((self._lines - len(screen_lines)) * self._font.height) // 2
+
+                for line in screen_lines:
+                    placements.append((len(pages), line, y))
+                    y += self._font.height
+                pages.append((index, " ".join(screen_lines)))
+
+        if len(pages) == 0:
+            return np.zeros((0, *self.shape), dtype=bool), pages
+
+        # find the source of every column of every line of text
+        sources, rows, xs, shifts = [], [], [], []
+        for row, (_, line, y) in enumerate(placements):
+            if line == "":
+                continue
+            if self._lines == 0:
+                raise ValueError("Invalid Line Selected")
+
+            line_sources = self.packed_font.column_sources(line)
+            if not allow_clip and len(line_sources) > width:
+                raise ValueError(f"Text '{line}' cannot fit on screen")
+
+            line_sources = line_sources[:width]
+            if align is TextAlign.LEFT:
+                start = 0
+            elif align is TextAlign.RIGHT:
+                start = width - len(line_sources)
+            elif align is TextAlign.CENTRE:
+                start = (width - len(line_sources)) // 2
             else:
-                # we have filled the screen - just output it
-                multiline_output.append((screen_state, screen_text))
+                raise ValueError("Unknown Alignment")
+
+            sources.append(line_sources)
+            rows.append(np.full(len(line_sources), row))
+            xs.append(np.arange(start, start + len(line_sources)))
+            shifts.append(np.full(len(line_sources), y, dtype=np.uint64))
+
+        # gather every column at once, draw each line into its own row, then
+        #  combine the lines of each screen (they never overlap)
+        line_columns = np.zeros((len(placements), width), dtype=np.uint64)
+        if sources:
+            columns = self.packed_font.column_values[np.concatenate(sources)]
+            line_columns[np.concatenate(rows), np.concatenate(xs)] = (
+                columns << np.concatenate(shifts)
+            )
+        screen_starts = np.flatnonzero(
+            np.diff([-1] + [screen for screen, _, _ in placements])
+        )
+        screens = np.bitwise_or.reduceat(line_columns, screen_starts, axis=0)
+
+        # finally, unpack the columns into pixels
+        return self._to_pixels(screens), pages
+
+    def long_text(
+        self,
+        text: str,
+        align: TextAlign = TextAlign.CENTRE,
+        allow_clip: bool = True,
+        layout: TextLayout = TextLayout.GREEDY,
+    ) -> list[tuple[Optional[np.ndarray], str]]:
+        """Splits a long message into multiple screens of text"""
+        frames, pages = self.batch_text(
+            [text], align, allow_clip=allow_clip, layout=layout
+        )
+        return [(frame, screen_text) for frame, (_, screen_text) in zip(frames, pages)]
+
+    def field(
+        self,
+        template: str,
+        charset: str = string.digits,
+        align: TextAlign = TextAlign.CENTRE,
+        line: int = 0,
+    ) -> "TextField":
+        """Lays out a fixed-layout text field on the screen (see `TextField`)"""
+        return TextField(self, template, charset=charset, align=align, line=line)
+
+    def marquee(
+        self,
+        text: str,
+        step: int = 1,
+        speed: Optional[float] = None,
+        loop: bool = False,
+        gap: Optional[int] = None,
+        line: int = 0,
+    ) -> Iterator[np.ndarray]:
+        """
+        Scrolls a message across the screen from right to left. The message is
+        only rendered once, into a strip the full length of the message - each
+        frame is then a view into that strip, so no copying is done per-frame
+
+        :param text: the message to scroll
+        :param step: the number of pixels to move the message by each frame
+        :param speed: the speed to scroll at, in pixels per second. If this is
+                      not set, frames are produced as fast as they are used
+                      (i.e. at the maximum rate of the sign)
+        :param loop: whether to keep repeating the message forever
+        :param gap: the gap left between repeats of the message, in pixels
+                    (defaults to the width of the screen)
+        :param line: the line of the screen to show the message on
+        """
+        if step < 1:
+            raise ValueError("Step must be at least one pixel")
+        if line >= self._lines:
+            raise ValueError("Invalid Line Selected")
+
+        width, height = self.shape
+        rendered_text = np.zeros((0, self._font.height), dtype=bool)
+        if text != "":
+            rendered_text = self._font.string(text).astype(bool)
+        rendered_text = rendered_text[:, : height - line * self._font.height]
+
+        # the message (plus the gap, if looping) that makes up a single repeat
+        content_width = rendered_text.shape[0]
+        if loop:
+            content_width += width if gap is None else gap
+            if content_width == 0:
+                raise ValueError("Cannot loop an empty message with no gap")
+
+        # the message enters from the right of a blank screen, and either
+        #  leaves to the left or is followed by further repeats of itself
+        repeats = 1 + (-(-width // content_width) if loop else 0)
+        strip = np.zeros((width + repeats * content_width + width, height), dtype=bool)
+        y_start = line * self._font.height
+        y_end = y_start + rendered_text.shape[1]
+        for i in range(repeats):
+            x_start = width + i * content_width
+            strip[x_start : x_start + rendered_text.shape[0], y_start:y_end] = (
+                rendered_text
+            )
+
+        interval = None if speed is None else step / speed
+        next_frame = monotonic()
+        position = 0
+        while loop or position <= width + content_width:
+            if interval is not None:
+                if (delay := next_frame - monotonic()) > 0:
+                    sleep(delay)
+                next_frame += interval
+
+            yield strip[position : position + width]
 
-            return multiline_output[1:]  # the first entry is None, None
+            position += step
+            if loop and position >= width + content_width:
+                # this frame is identical to one we have already shown, so
+                #  jump back to it rather than running off the end of the strip
+                #  (the step can be longer than a whole repeat)
+                position = width + (position - width) % content_width
+
+
+@dataclass
+class TextSpan:
+    """A run of text, drawn as part of a screen by `TextRenderer.rich_text`"""
+
+    text: str
+    font: Optional[Font] = None  # defaults to the font of the renderer
+    align: TextAlign = TextAlign.LEFT
+    line: int = 0
+    offset: tuple[int, int] = (0, 0)  # shifts the text by (x, y) pixels
+
+
+class TextField:
+    """
+    A line of text with a fixed layout, such as a clock. The field is split into
+    one cell per character when it is created, and updating the text only
+    redraws the cells whose character has actually changed
+    """
+
+    def __init__(
+        self,
+        renderer: TextRenderer,
+        template: str,
+        charset: str = string.digits,
+        align: TextAlign = TextAlign.CENTRE,
+        line: int = 0,
+    ):
+        """
+        :param renderer: the renderer for the screen the field is shown on
+        :param template: an example of the text shown in the field (e.g.
+                         "00:00:00" for a clock)
+        :param charset: the characters that can change - a position in the
+                        template holding one of these is made wide enough to
+                        fit any of them, while any other character is fixed
+        :param align: the alignment of the field on the screen
+        :param line: the line of the screen to show the field on
+        """
+        if line >= renderer._lines:
+            raise ValueError("Invalid Line Selected")
+
+        self._font = renderer.font
+        self._glyphs: dict[str, np.ndarray] = {}
+        charset_width = max(self._glyph(char).shape[0] for char in charset)
+        self._cell_widths = [
+            charset_width if char in charset else self._glyph(char).shape[0]
+            for char in template
+        ]
+
+        # cells have a one-pixel gap between them, the same as `Font.string`
+        width = sum(self._cell_widths) + len(template) - 1
+        if width > renderer.shape[0]:
+            raise ValueError(f"Field '{template}' cannot fit on screen")
+        if align is TextAlign.LEFT:
+            start = 0
+        elif align is TextAlign.RIGHT:
+            start = renderer.shape[0] - width
+        elif align is TextAlign.CENTRE:
+            start = (renderer.shape[0] - width) // 2
         else:
-            return output
+            raise ValueError("Unknown Alignment")
+
+        self._positions = []
+        for cell_width in self._cell_widths:
+            self._positions.append(start)
+            start += cell_width + 1
+        self._y = line * self._font.height
+        self._width = width
+        self._cells: dict[tuple[int, str], np.ndarray] = {}
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> Optional[str]:
+        """The text currently drawn in the field"""
+        return self._text
+
+    @property
+    def width(self) -> int:
+        """The width of the field, in pixels"""
+        return self._width
+
+    def _glyph(self, char: str) -> np.ndarray:
+        if char not in self._glyphs:
+            glyph = np.array(self._font.char(char), dtype=bool)
+            self._glyphs[char] = glyph.reshape(-1, self._font.height)
+        return self._glyphs[char]
+
+    def _cell(self, index: int, char: str) -> np.ndarray:
+        """The image of a single cell, with the character centred within it"""
+        width = self._cell_widths[index]
+        if (width, char) not in self._cells:
+            glyph = self._glyph(char)
+            cell = np.zeros((width, self._font.height), dtype=bool)
+            if glyph.shape[0] <= width:
+                start = (width - glyph.shape[0]) // 2
+                cell[start : start + glyph.shape[0]] = glyph
+            else:
+                start = (glyph.shape[0] - width) // 2
+                cell[:] = glyph[start : start + width]
+            self._cells[(width, char)] = cell
+        return self._cells[(width, char)]
+
+    def invalidate(self):
+        """Forces every cell to be redrawn on the next update"""
+        self._text = None
+
+    def update(self, text: str, sign: "Sign") -> int:
+        """
+        Draws new text into the field on a sign. Note that this does not update
+        the sign: you must call `Sign.update` for that
+
+        :returns: the number of cells that were redrawn
+        """
+        if len(text) != len(self._positions):
+            raise ValueError(
+                f"Text '{text}' does not match the field length ({len(self._positions)})"
+            )
+
+        previous = self._text if self._text is not None else [None] * len(text)
+        changed = 0
+        for i, (old_char, new_char) in enumerate(zip(previous, text)):
+            if old_char != new_char:
+                sign.blit(self._cell(i, new_char), (self._positions[i], self._y))
+                changed += 1
+
+        self._text = text
+        return changed
 
 
-ADAFRUIT_5X7 = BinaryFont(ADAFRUIT_5X7_DATA, space_width=1, height=8)
-ADAFRUIT_5X7_KERN = BinaryFont(ADAFRUIT_5X7_DATA, space_width=1, height=8, kern=True)
-NEWBASIC_3X5 = BinaryFont(NEWBASIC_3X5_DATA, space_width=1, height=8, offset=32)
-NEWBASIC_3X5_KERN = BinaryFont(
-    NEWBASIC_3X5_DATA, space_width=1, height=8, kern=True, offset=32
+def _binary_font(data_name: str, **kwargs) -> Callable[[], Font]:
+    def factory():
+        from flippy import font_data
+
+        return BinaryFont(getattr(font_data, data_name), **kwargs)
+
+    return factory
+
+
+FONTS = FontRegistry()
+font_data_path = pathlib.Path(__file__).parent.joinpath("font_data.py")
+
+FONTS.register(
+    "ADAFRUIT_5X7",
+    _binary_font("ADAFRUIT_5X7_DATA", space_width=1, height=8),
+    sources=(font_data_path,),
+)
+FONTS.register(
+    "ADAFRUIT_5X7_KERN",
+    _binary_font("ADAFRUIT_5X7_DATA", space_width=1, height=8, kern=True),
+    sources=(font_data_path,),
+)
+FONTS.register(
+    "NEWBASIC_3X5",
+    _binary_font("NEWBASIC_3X5_DATA", space_width=1, height=8, offset=32),
+    sources=(font_data_path,),
 )
-WENDY_3X5 = BinaryFont(WENDY_3X5_DATA, space_width=1, height=5, offset=32)
-WENDY_3X5_KERN = BinaryFont(
-    WENDY_3X5_DATA, space_width=1, height=5, kern=True, offset=32
+FONTS.register(
+    "NEWBASIC_3X5_KERN",
+    _binary_font("NEWBASIC_3X5_DATA", space_width=1, height=8, kern=True, offset=32),
+    sources=(font_data_path,),
+)
+FONTS.register(
+    "WENDY_3X5",
+    _binary_font("WENDY_3X5_DATA", space_width=1, height=5, offset=32),
+    sources=(font_data_path,),
+)
+FONTS.register(
+    "WENDY_3X5_KERN",
+    _binary_font("WENDY_3X5_DATA", space_width=1, height=5, kern=True, offset=32),
+    sources=(font_data_path,),
 )
 
 # this is not bundled, but can be found from a default minecraft texture pack
 #  (e.g. https://www.curseforge.com/minecraft/texture-packs/vanilladefault)
 #  as assets/minecraft/textures/font/ascii.png
-MINECRAFT = None
 minecraft_font_path = pathlib.Path(__file__).parent.joinpath("minecraft_font.png")
-if minecraft_font_path.exists():
-    MINECRAFT = BitmapFont(minecraft_font_path, space_width=1)
+FONTS.register(
+    "MINECRAFT",
+    lambda: BitmapFont(minecraft_font_path, space_width=1),
+    sources=(minecraft_font_path,),
+)
 
-MINECRAFT_ENCHANT = None
 minecraft_enchant_font_path = pathlib.Path(__file__).parent.joinpath(
     "minecraft_enchant_font.png"
 )
-if minecraft_enchant_font_path.exists():
-    MINECRAFT_ENCHANT = BitmapFont(minecraft_enchant_font_path, space_width=1)
+FONTS.register(
+    "MINECRAFT_ENCHANT",
+    lambda: BitmapFont(minecraft_enchant_font_path, space_width=1),
+    sources=(minecraft_enchant_font_path,),
+)
+
+
+def __getattr__(name: str):
+    # fonts are built the first time they are imported or accessed
+    if name in FONTS:
+        return FONTS.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,159 @@
+"""
+Transforms for frames that are already packed into the layout sent to the sign
+(see `flippy.comms.pack_image`), with the shape `(WIDTH, ceil(HEIGHT / 8))`.
+Stacks of frames, with the shape `(N, WIDTH, ceil(HEIGHT / 8))`, work too.
+
+Moving columns around (mirroring, horizontal shifts and scaling) works on the
+bytes directly. Moving rows around treats each column as a 64-bit integer, so
+is limited to frames up to 64px tall - the same as packed fonts
+"""
+
+from enum import Enum
+from typing import Optional
+
+import numpy as np
+
+from flippy.comms import pack_image, unpack_image
+
+# each byte, with the order of its bits reversed
+_REVERSED_BITS = np.packbits(
+    np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder="little"),
+    axis=1,
+).ravel()
+
+
+class Mounting(Enum):
+    """How a sign is mounted, compared to the way it was designed to be"""
+
+    NORMAL = 0
+    UPSIDE_DOWN = 1  # rotated by 180°
+    MIRRORED = 2  # flipped from left to right
+    FLIPPED = 3  # flipped from top to bottom
+
+
+def _padded(packed: np.ndarray) -> np.ndarray:
+    """Pads each column out to 8 bytes, so that it can be viewed as an integer"""
+    if packed.shape[-1] > 8:
+        raise ValueError("Only frames up to 64px tall can be transformed")
+    padded = np.zeros((*packed.shape[:-1], 8), dtype=np.uint8)
+    padded[..., : packed.shape[-1]] = packed
+    return padded
+
+
+def _to_columns(packed: np.ndarray) -> np.ndarray:
+    """Converts a packed frame into one integer per column (top row lowest)"""
+    return _padded(packed).view("<u8")[..., 0]
+
+
+def _from_columns(columns: np.ndarray, height: int) -> np.ndarray:
+    """Reverses `_to_columns`, clearing anything below the bottom row"""
+    columns = columns.astype("<u8") & np.uint64((1 << height) - 1)
+    packed = columns[..., None].view(np.uint8)
+    return np.ascontiguousarray(packed[..., : -(-height // 8)])
+
+
+def mirror_horizontal(packed: np.ndarray) -> np.ndarray:
+    """Flips a frame from left to right"""
+    return np.ascontiguousarray(packed[..., ::-1, :])
+
+
+def mirror_vertical(packed: np.ndarray, height: int) -> np.ndarray:
+    """Flips a frame from top to bottom"""
+    # reversing all 64 bits of a column puts its top row in the highest bit
+    flipped = _REVERSED_BITS[_padded(packed)[..., ::-1]]
+    columns = np.ascontiguousarray(flipped).view("<u8")[..., 0]
+    return _from_columns(columns >> np.uint64(64 - height), height)
+
+
+def rotate(packed: np.ndarray, height: int, turns: int = 1) -> np.ndarray:
+    """
+    Rotates a frame clockwise by a number of quarter turns. Note that a
+    quarter turn swaps the width and height of the frame
+    """
+    turns %= 4
+    if turns == 0:
+        return packed
+    elif turns == 2:
+        return mirror_horizontal(mirror_vertical(packed, height))
+
+    pixels = unpack_image(packed, height)
+    if turns == 1:
+        rotated = pixels[..., :, ::-1]
+    else:
+        rotated = pixels[..., ::-1, :]
+    return pack_image(np.swapaxes(rotated, -1, -2))
+
+
+def shift(
+    packed: np.ndarray, height: int, x: int = 0, y: int = 0, wrap: bool = False
+) -> np.ndarray:
+    """
+    Moves a frame right by `x` and down by `y` pixels (negative values move it
+    left or up). Anything moved off the edge is lost, unless `wrap` is set -
+    in which case it reappears on the other side
+    """
+    width = packed.shape[-2]
+    if x != 0:
+        if wrap:
+            packed = np.roll(packed, x, axis=-2)
+        else:
+            moved = np.zeros_like(packed)
+            if abs(x) < width:
+                if x > 0:
+                    moved[..., x:, :] = packed[..., :-x, :]
+                else:
+                    moved[..., :x, :] = packed[..., -x:, :]
+            packed = moved
+
+    if wrap:
+        y %= height  # a whole turn leaves the frame as it is
+    if y != 0:
+        columns = _to_columns(packed)
+        if wrap:
+            columns = (columns << np.uint64(y)) | (columns >> np.uint64(height - y))
+        elif abs(y) >= height:
+            columns = np.zeros_like(columns)
+        elif y > 0:
+            columns = columns << np.uint64(y)
+        else:
+            columns = columns >> np.uint64(-y)
+        packed = _from_columns(columns, height)
+
+    return packed
+
+
+def invert(packed: np.ndarray, height: int) -> np.ndarray:
+    """Swaps every pixel that is on for one that is off, and vice versa"""
+    inverted = ~np.asarray(packed, dtype=np.uint8)
+    if height % 8:
+        # keep the padding below the bottom row clear
+        inverted[..., -1] &= np.uint8((1 << (height % 8)) - 1)
+    return inverted
+
+
+def scale(
+    packed: np.ndarray, height: int, x: int = 2, y: Optional[int] = None
+) -> np.ndarray:
+    """
+    Scales a frame up by a whole number of times, horizontally by `x` and
+    vertically by `y` (which defaults to `x`). The new height is `height * y`
+    """
+    y = x if y is None else y
+    packed = np.repeat(packed, x, axis=-2)
+    if y == 1:
+        return packed
+    return pack_image(np.repeat(unpack_image(packed, height), y, axis=-1))
+
+
+def mount(packed: np.ndarray, height: int, mounting: Mounting) -> np.ndarray:
+    """Converts a frame to be shown on a sign that has been mounted differently"""
+    if mounting is Mounting.NORMAL:
+        return packed
+    elif mounting is Mounting.UPSIDE_DOWN:
+        return rotate(packed, height, 2)
+    elif mounting is Mounting.MIRRORED:
+        return mirror_horizontal(packed)
+    elif mounting is Mounting.FLIPPED:
+        return mirror_vertical(packed, height)
+    else:
+        raise ValueError("Unknown Mounting")
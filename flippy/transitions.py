@@ -0,0 +1,185 @@
+"""
+Animated transitions between two frames, such as consecutive pages of lyrics.
+Each transition is generated in one go, as a stack of frames with the shape
+`(N, WIDTH, HEIGHT)` - so transitions can be worked out ahead of time (see
+`precompute`), and then played back without any extra work
+"""
+
+import functools
+from enum import Enum
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+
+class Transition(Enum):
+    SCROLL = 0  # the new frame scrolls up from the bottom of the sign
+    WIPE = 1  # the new frame is revealed from left to right
+    DISSOLVE = 2  # the new frame is revealed a random pixel at a time
+
+
+def _steps(total: int, steps: Optional[int]) -> np.ndarray:
+    """Evenly spaced positions between 0 and `total` (exclusive of both)"""
+    if steps is None or steps >= total:
+        return np.arange(1, total)
+    return np.linspace(0, total, steps + 2, dtype=int)[1:-1]
+
+
+def scroll(start: np.ndarray, end: np.ndarray, steps: Optional[int] = None):
+    """
+    Scrolls `start` up and off the sign, while `end` scrolls in from below
+
+    :param steps: the number of intermediate frames (defaults to one per row)
+    """
+    height = start.shape[1]
+    offsets = _steps(height, steps)
+
+    # both frames stacked vertically, with a sliding window moving down them
+    stacked = np.concatenate([start, end], axis=1).astype(bool)
+    rows = offsets[:, None] + np.arange(height)
+    return np.ascontiguousarray(stacked[:, rows].transpose(1, 0, 2))
+
+
+def wipe(start: np.ndarray, end: np.ndarray, steps: Optional[int] = None):
+    """
+    Reveals `end` over the top of `start`, from left to right
+
+    :param steps: the number of intermediate frames (defaults to one per column)
+    """
+    columns = _steps(start.shape[0], steps)
+    revealed = np.arange(start.shape[0]) < columns[:, None]
+    return np.where(revealed[:, :, None], end.astype(bool), start.astype(bool))
+
+
+@functools.lru_cache(maxsize=16)
+def _dissolve_order(shape: tuple[int, int], seed: int) -> np.ndarray:
+    """The order in which each pixel is revealed, which is kept for reuse"""
+    order = np.random.default_rng(seed).permutation(shape[0] * shape[1])
+    order = order.reshape(shape)
+    order.flags.writeable = False
+    return order
+
+
+def dissolve(start: np.ndarray, end: np.ndarray, steps: int = 8, seed: int = 0):
+    """
+    Reveals `end` over the top of `start`, a random selection of pixels at a
+    time. The random order is generated once per sign size and seed
+
+    :param steps: the number of intermediate frames
+    :param seed: the seed for the order the pixels are revealed in
+    """
+    order = _dissolve_order(start.shape, seed)
+    thresholds = _steps(order.size, steps)
+    revealed = order < thresholds[:, None, None]
+    return np.where(revealed, end.astype(bool), start.astype(bool))
+
+
+def transition(
+    kind: Transition, start: np.ndarray, end: np.ndarray, steps: Optional[int] = None
+) -> np.ndarray:
+    """Generates the intermediate frames for a transition between two frames"""
+    if start.shape != end.shape:
+        raise ValueError("Frames must be the same shape to transition between them")
+
+    if kind is Transition.SCROLL:
+        return scroll(start, end, steps)
+    elif kind is Transition.WIPE:
+        return wipe(start, end, steps)
+    elif kind is Transition.DISSOLVE:
+        return dissolve(start, end, 8 if steps is None else steps)
+    else:
+        raise ValueError("Unknown Transition")
+
+
+def precompute(
+    frames: Sequence[Optional[np.ndarray]],
+    kind: Transition,
+    steps: Union[None, int, Sequence[Optional[int]]] = None,
+) -> list[Optional[np.ndarray]]:
+    """
+    Generates the transitions between each frame of a sequence and the next
+    one (e.g. every screen of a song). Blank frames can be given as `None`
+
+    :param steps: the number of intermediate frames, for every transition or
+                  as a list with one entry per transition (0 to cut straight
+                  to the next frame)
+    :returns: a list where entry `i` holds the frames that lead from frame `i`
+              to frame `i + 1` (`None` for the final frame)
+    """
+    shape = next((frame.shape for frame in frames if frame is not None), None)
+    if shape is None:
+        return [None] * len(frames)
+
+    blank = np.zeros(shape, dtype=bool)
+    frames = [blank if frame is None else frame for frame in frames]
+    if steps is None or isinstance(steps, int):
+        steps = [steps] * (len(frames) - 1)
+    transitions = [
+        transition(kind, start, end, count)
+        for start, end, count in zip(frames, frames[1:], steps)
+    ]
+    transitions.append(None)
+    return transitions
+
+
+def frame_at(
+    screens: Sequence[tuple[float, Optional[np.ndarray]]],
+    transitions: Optional[Sequence[Optional[np.ndarray]]],
+    index: int,
+    time: float,
+    duration: float = 1,
+) -> Optional[np.ndarray]:
+    """
+    Picks the frame to show at a given time, for a sequence of timed screens and
+    their (precomputed) transitions. Each transition is played during the
+    `duration` seconds before the next screen is due, so that the next screen
+    still appears on time
+
+    :param screens: a list of `(time, frame)` pairs
+    :param transitions: the output of `precompute` for these screens
+    :param index: the index of the screen currently being shown
+    :param time: the current time
+    """
+    screen = screens[index][1]
+    if not transitions or index + 1 >= len(screens):
+        return screen
+
+    frames = transitions[index]
+    next_time = screens[index + 1][0]
+
+    # don't let the transition take up more than half of the time on screen
+    duration = min(duration, (next_time - screens[index][0]) / 2)
+    progress = 1 - (next_time - time) / duration if duration > 0 else 0
+    if frames is None or len(frames) == 0 or not 0 <= progress < 1:
+        return screen
+    return frames[int(progress * len(frames))]
+
+
+def next_change(
+    screens: Sequence[tuple[float, Optional[np.ndarray]]],
+    transitions: Optional[Sequence[Optional[np.ndarray]]],
+    index: int,
+    time: float,
+    duration: float = 1,
+) -> Optional[float]:
+    """
+    The time at which `frame_at` will next pick a different frame (or `None` if
+    the current screen is the last one), so that playback can wait until then
+    rather than checking every few milliseconds. Takes the same arguments as
+    `frame_at`
+    """
+    if index + 1 >= len(screens):
+        return None
+
+    next_time = screens[index + 1][0]
+    frames = transitions[index] if transitions else None
+    duration = min(duration, (next_time - screens[index][0]) / 2)
+    if frames is None or len(frames) == 0 or duration <= 0:
+        return next_time
+
+    # each frame of the transition is shown for an equal share of `duration`
+    start = next_time - duration
+    if time < start:
+        return start
+    step = int((time - start) / duration * len(frames)) + 1
+    return min(next_time, start + step * duration / len(frames))
@@ -0,0 +1,129 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from utils import fetch_lyrics
+from utils.fetch_lyrics import get_lyrics, lyrics_service
+from utils.http_client import HttpClient, set_client
+
+LRC = "[00:01.00]first line\n[00:02.50]second line"
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """A local stand-in for a lyrics service, which can be slow or fail"""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        time.sleep(float(parse_qs(url.query).get("delay", ["0"])[0]))
+        if url.path == "/fail":
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        body = LRC.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def client():
+    client = HttpClient(timeout=5, retries=0)
+    set_client(client)
+    yield client
+    set_client(None)
+    client.close()
+
+
+def service(url: str):
+    """A service that fetches its lyrics from the stand-in"""
+
+    # not registered, so it is only used by the test that makes it
+    @lyrics_service(enabled=False)
+    def _stand_in(song):
+        response = fetch_lyrics.get_client().get(url)
+        response.raise_for_status()
+        return response.text, url, True
+
+    return _stand_in
+
+
+def search(monkeypatch, services, **kwargs):
+    monkeypatch.setattr(fetch_lyrics, "SERVICES", services)
+    start = time.monotonic()
+    lyrics = get_lyrics("Artist", "Title", save=False, cache=False, **kwargs)
+    return lyrics, time.monotonic() - start
+
+
+def test_slow_service_times_out(server, monkeypatch):
+    slow = service(f"{server}/lrc?delay=2")
+    fast = service(f"{server}/lrc")
+    lyrics, elapsed = search(monkeypatch, [slow, fast], timeout=0.5)
+
+    assert lyrics.source == f"{server}/lrc"
+    assert lyrics.lines == [(1.0, "first line"), (2.5, "second line")]
+    assert elapsed < 1.5
+
+
+def test_failing_service_is_skipped(server, monkeypatch):
+    failing = service(f"{server}/fail")
+    working = service(f"{server}/lrc")
+    lyrics, _ = search(monkeypatch, [failing, working])
+
+    assert lyrics.source == f"{server}/lrc"
+    assert failing.stats.errors == 1
+    assert working.stats.errors == 0
+
+
+def test_each_service_has_its_own_timeout(server, monkeypatch):
+    # with one worker, the second service only starts once the first has
+    #  finished (after its timeout) - it still gets its own time to answer
+    monkeypatch.setattr(fetch_lyrics, "MAX_WORKERS", 1)
+    slow = service(f"{server}/lrc?delay=1")
+    later = service(f"{server}/lrc?delay=0.3")
+    lyrics, elapsed = search(monkeypatch, [slow, later], timeout=0.8)
+
+    assert lyrics.source == f"{server}/lrc?delay=0.3"
+    assert 1.2 < elapsed < 2
+
+
+def test_search_stops_at_budget(server, monkeypatch):
+    slow = service(f"{server}/lrc?delay=2")
+    lyrics, elapsed = search(monkeypatch, [slow], timeout=5, budget=0.5)
+
+    assert lyrics is None
+    assert elapsed < 1
+
+
+def test_services_keep_their_order_unless_slow_or_failing(server, monkeypatch):
+    slow = service(f"{server}/lrc?delay=0.2")
+    fast = service(f"{server}/lrc")
+    failing = service(f"{server}/fail")
+    services = [failing, slow, fast]
+    for _ in range(2):
+        search(monkeypatch, services)
+
+    # the slower service is still preferred, but the failing one is demoted
+    assert fetch_lyrics._ranked_services() == [slow, fast, failing]
+    lyrics, _ = search(monkeypatch, services)
+    assert lyrics.source == f"{server}/lrc?delay=0.2"
+
+    # a service that keeps taking a second to find nothing is clearly slower
+    for _ in range(5):
+        slow.stats.record(1, found=False)
+    assert fetch_lyrics._ranked_services() == [fast, slow, failing]
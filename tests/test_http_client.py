@@ -0,0 +1,160 @@
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from utils import http_client
+from utils.http_client import HttpClient
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """
+    A local stand-in server: `/flaky?fails=N` fails with a 503 the first N
+    times, `/slow` counts the requests it is handling at once, `/cookie` sets
+    a cookie, and anything else echoes back the cookies it was sent
+    """
+
+    hits: Counter = Counter()
+    lock = threading.Lock()
+    active = 0
+    most_active = 0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        with self.lock:
+            self.hits[url.path] += 1
+            hits = self.hits[url.path]
+
+        if url.path == "/flaky":
+            fails = int(parse_qs(url.query)["fails"][0])
+            self.reply(503 if hits <= fails else 200, str(hits))
+        elif url.path == "/slow":
+            with self.lock:
+                StandIn.active += 1
+                StandIn.most_active = max(StandIn.most_active, StandIn.active)
+            time.sleep(0.2)
+            with self.lock:
+                StandIn.active -= 1
+            self.reply(200, "slow")
+        elif url.path == "/cookie":
+            self.reply(200, "set", {"Set-Cookie": "session=abc; Path=/"})
+        else:
+            self.reply(200, self.headers.get("Cookie", ""))
+
+    do_POST = do_GET
+
+    def reply(self, status: int, text: str, headers: dict = None):
+        body = text.encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StandIn.hits.clear()
+    StandIn.most_active = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """The delays slept for between retries, always the longest allowed"""
+    delays = []
+    monkeypatch.setattr(http_client.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(http_client, "sleep", delays.append)
+    return delays
+
+
+@pytest.fixture
+def client():
+    client = HttpClient(timeout=5, retries=2, backoff=0.5)
+    yield client
+    client.close()
+
+
+@pytest.mark.parametrize(
+    "fails, status, hits",
+    [
+        (0, 200, 1),
+        (2, 200, 3),  # the last retry works
+        (5, 503, 3),  # gives up after two retries
+    ],
+)
+def test_temporary_errors_are_retried(server, client, delays, fails, status, hits):
+    response = client.get(f"{server}/flaky?fails={fails}")
+
+    assert response.status_code == status
+    assert StandIn.hits["/flaky"] == hits
+    assert delays == [0.5, 1.0][: hits - 1]
+
+
+def test_unsafe_requests_are_not_retried(server, client, delays):
+    response = client.post(f"{server}/flaky?fails=1")
+
+    assert response.status_code == 503
+    assert StandIn.hits["/flaky"] == 1
+    assert delays == []
+
+
+def test_connection_errors_are_retried_then_raised(client, delays):
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+
+    with pytest.raises(requests.ConnectionError):
+        client.get(f"http://127.0.0.1:{port}/")
+    assert delays == [0.5, 1.0]
+
+
+def test_hosts_are_sent_to_a_stand_in(server):
+    client = HttpClient(hosts={"lrclib.net": server})
+    try:
+        response = client.get("https://lrclib.net/flaky?fails=0")
+    finally:
+        client.close()
+
+    assert response.status_code == 200
+    assert StandIn.hits["/flaky"] == 1
+
+
+def test_requests_to_a_host_are_limited(server):
+    client = HttpClient(max_per_host=2)
+    threads = [
+        threading.Thread(target=client.get, args=(f"{server}/slow",)) for _ in range(6)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        client.close()
+
+    assert StandIn.hits["/slow"] == 6
+    assert StandIn.most_active == 2
+
+
+def test_cookies_are_not_kept_between_requests(server, client):
+    set_cookie = client.get(f"{server}/cookie")
+    assert set_cookie.cookies["session"] == "abc"
+
+    # only cookies that are passed on by hand are sent
+    assert client.get(f"{server}/echo").text == ""
+    sent = client.get(f"{server}/echo", cookies=set_cookie.cookies)
+    assert sent.text == "session=abc"
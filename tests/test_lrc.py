@@ -0,0 +1,69 @@
+import pytest
+
+from utils import lrc
+
+
+@pytest.mark.parametrize(
+    "source, lines",
+    [
+        ("[00:12]Whole seconds", [(12.0, "Whole seconds")]),
+        ("[00:12.3]Tenths", [(12.3, "Tenths")]),
+        ("[01:02.34]Hundredths", [(62.34, "Hundredths")]),
+        ("[00:12.345]Milliseconds", [(12.345, "Milliseconds")]),
+        ("[00:12:34]Colon", [(12.34, "Colon")]),
+        ("[1:02.50]Short minutes", [(62.5, "Short minutes")]),
+        (
+            "[00:15.00][01:15.00]Chorus",
+            [(15.0, "Chorus"), (75.0, "Chorus")],
+        ),
+        (
+            "[00:20.00]<00:20.00>Word <00:20.50>timing",
+            [(20.0, "Word timing")],
+        ),
+        ("[00:01.00]First<br>Second", [(1.0, "First")]),
+        ("[00:01.00]“Quoted”", [(1.0, '"Quoted"')]),
+        ("[00:01.00]  Padded  ", [(1.0, "Padded")]),
+    ],
+)
+def test_lines(source, lines):
+    assert list(lrc.iter_lines(source)) == lines
+
+
+@pytest.mark.parametrize(
+    "source, lines",
+    [
+        # tags, untimed and empty lines are skipped
+        ("[ti:Title]\n[ar:Artist]\nNo time\n[00:01.00]\n[00:02.00]Kept", [2.0]),
+        # the offset applies to the lines after it, and can't go below zero
+        ("[00:01.00]A\n[offset:+500]\n[00:02.00]B\n[00:00.20]C", [1.0, 1.5, 0.0]),
+        ("[offset:-250]\n[00:01.00]A", [1.25]),
+        ("[offset:nonsense]\n[00:01.00]A", [1.0]),
+        # lines are split on every kind of line break and `<br>`
+        ("[00:01.00]A\r\n[00:02.00]B\r[00:03.00]C", [1.0, 2.0, 3.0]),
+        ("[00:01.00]A<br/>[00:02.00]B<BR />[00:03.00]C", [1.0, 2.0, 3.0]),
+    ],
+)
+def test_times(source, lines):
+    assert [time for time, _ in lrc.iter_lines(source)] == lines
+
+
+def test_lines_from_a_file():
+    source = ["[00:02.00]Second\n", "[00:01.00]First\n"]
+    assert list(lrc.iter_lines(source)) == [(2.0, "Second"), (1.0, "First")]
+
+
+def test_sorted_by_time_keeping_the_order_of_ties():
+    source = "[00:05.00]Late\n[00:01.00][00:05.00]Both\n[00:01.00]Early"
+    array = lrc.parse(source)
+
+    assert array.tolist() == [
+        (1.0, "Both"),
+        (1.0, "Early"),
+        (5.0, "Late"),
+        (5.0, "Both"),
+    ]
+    assert array.dtype.names == ("time", "text")
+
+
+def test_nothing_to_parse():
+    assert lrc.parse("[ti:Title]\nNo times").tolist() == []
@@ -0,0 +1,145 @@
+import pytest
+
+from utils import playback_sync
+from utils.playback_sync import (
+    IDLE_INTERVAL,
+    MAX_INTERVAL,
+    MIN_INTERVAL,
+    PAUSED_INTERVAL,
+    SETTLE,
+    PlaybackSync,
+)
+
+
+class Player:
+    """
+    A scripted player on a fake clock, which answers each poll after `latency`
+    seconds - reading its progress `read_at` of the way through the request
+    """
+
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        self.uri = "spotify:track:one"
+        self.duration = 200.0
+        self.start = self.now - 10  # 10s into the track
+        self.paused_at: float | None = None  # progress, while paused
+        self.nothing = False
+        self.latency, self.read_at = 0.2, 0.5
+        monkeypatch.setattr(playback_sync, "monotonic", lambda: self.now)
+        self.sync = PlaybackSync(self.fetch)
+
+    def fetch(self):
+        read = self.now + self.latency * self.read_at
+        self.now += self.latency
+        if self.nothing:
+            return None
+        progress = read - self.start if self.paused_at is None else self.paused_at
+        return {
+            "item": {
+                "uri": self.uri,
+                "name": self.uri,
+                "duration_ms": self.duration * 1000,
+            },
+            "is_playing": self.paused_at is None,
+            "progress_ms": progress * 1000,
+        }
+
+    def poll(self, latency: float = 0.2, read_at: float = 0.5, wait: float = 0):
+        self.now += wait
+        self.latency, self.read_at = latency, read_at
+        self.sync.poll()
+
+    def settle(self):
+        for _ in range(SETTLE):
+            self.poll(wait=MIN_INTERVAL)
+
+
+def test_start_time_is_the_median_under_jitter(monkeypatch):
+    player = Player(monkeypatch)
+    # each progress is read at a different point of a different length request
+    for latency, read_at in [(0.1, 0.2), (0.5, 0.9), (0.3, 0.3), (0.2, 0.6)]:
+        player.poll(latency, read_at, wait=1)
+
+    # the estimates are 0.03s late, 0.2s early, 0.06s late and 0.02s early -
+    #  the median of these is much closer than the mean (0.0325s early)
+    assert player.sync.start_time == pytest.approx(player.start + 0.005)
+    assert player.sync.round_trip == pytest.approx(0.25)
+
+
+def test_one_slow_poll_does_not_move_the_start_time(monkeypatch):
+    player = Player(monkeypatch)
+    player.settle()
+    # read at the very start of a slow request, so it is 0.8s out
+    player.poll(latency=1.6, read_at=0, wait=MAX_INTERVAL)
+
+    assert player.sync.start_time == pytest.approx(player.start)
+    assert player.sync.interval() == MAX_INTERVAL
+
+
+def test_seek_resets_the_estimate(monkeypatch):
+    player = Player(monkeypatch)
+    player.settle()
+    player.start -= 30  # skipped forwards
+    player.poll(wait=MAX_INTERVAL)
+
+    assert player.sync.start_time == pytest.approx(player.start)
+    assert player.sync.interval() == MIN_INTERVAL
+
+
+def test_pause_and_seek_while_paused(monkeypatch):
+    player = Player(monkeypatch)
+    player.settle()
+    player.paused_at = 20.0
+    player.poll(wait=MAX_INTERVAL)
+    assert player.sync.interval() == MIN_INTERVAL
+
+    player.settle()
+    assert player.sync.interval() == PAUSED_INTERVAL
+
+    player.paused_at = 50.0
+    player.poll(wait=PAUSED_INTERVAL)
+    assert player.sync.interval() == MIN_INTERVAL
+
+    # playing again, from where it was paused (as the poll is sent)
+    player.start = player.now + MIN_INTERVAL - 50
+    player.paused_at = None
+    player.poll(wait=MIN_INTERVAL)
+    assert player.sync.start_time == pytest.approx(player.start)
+    assert player.sync.interval() == MIN_INTERVAL
+
+
+def test_track_change_resets_the_estimate(monkeypatch):
+    player = Player(monkeypatch)
+    player.settle()
+    # the next track starts a moment after the poll is sent
+    player.uri = "spotify:track:two"
+    player.start = player.now + MAX_INTERVAL + 0.05
+    player.poll(wait=MAX_INTERVAL)
+
+    assert player.sync.start_time == pytest.approx(player.start)
+    assert player.sync.interval() == MIN_INTERVAL
+
+
+def test_interval_slows_down_mid_track_and_speeds_up_at_the_end(monkeypatch):
+    player = Player(monkeypatch)
+    player.poll()
+    assert player.sync.interval() == MIN_INTERVAL
+
+    player.settle()
+    assert player.sync.interval() == MAX_INTERVAL
+
+    # poll just after the track should end
+    player.now = player.start + player.duration - 4
+    assert player.sync.interval() == pytest.approx(4.5)
+    player.now = player.start + player.duration + 2
+    assert player.sync.interval() == MIN_INTERVAL
+
+
+def test_nothing_playing(monkeypatch):
+    player = Player(monkeypatch)
+    player.settle()
+    player.nothing = True
+    player.poll(wait=MAX_INTERVAL)
+
+    assert player.sync.start_time is None
+    assert player.sync.interval() == IDLE_INTERVAL
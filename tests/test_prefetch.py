@@ -0,0 +1,130 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+import spotipy
+
+from demo import autolyrics
+from demo.autolyrics import AutoLyricsDemo, Prefetcher, SpotifyTrack
+from utils.fetch_lyrics import Lyrics, Song
+
+
+def item(title: str) -> dict:
+    return {
+        "name": title,
+        "artists": [{"name": "Artist"}],
+        "album": {"name": "Album"},
+        "duration_ms": 180_000,
+    }
+
+
+class StubSpotify:
+    """Answers with a fixed queue, or fails like a token without the scope"""
+
+    def __init__(self, titles: list[str], error: bool = False):
+        self._titles = titles
+        self._error = error
+
+    def queue(self):
+        if self._error:
+            raise spotipy.SpotifyException(403, -1, "Insufficient client scope")
+        return {"queue": [item(title) for title in self._titles]}
+
+
+class StubPreparer:
+    def prepare(self, lyrics):
+        return lyrics
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """The titles that lyrics are fetched for - each waits until `release`"""
+    fetched = []
+    release = threading.Event()
+
+    def get_lyrics(artist, title, **kwargs):
+        fetched.append(title)
+        release.wait(5)
+        return Lyrics(Song(artist, title), "stub", "", [(0.0, title)])
+
+    monkeypatch.setattr(autolyrics, "get_lyrics", get_lyrics)
+    yield fetched, release
+    release.set()
+
+
+@pytest.fixture
+def prefetcher():
+    prefetcher = Prefetcher(
+        StubPreparer(), lambda lyrics: lyrics.lines, workers=1, capacity=2
+    )
+    yield prefetcher
+    prefetcher.close()
+
+
+def upcoming(spotify: StubSpotify, count: int = 2):
+    """`AutoLyricsDemo._upcoming`, without logging in to Spotify"""
+    demo = SimpleNamespace(_spotify=spotify, _prefetch=count)
+    return demo, lambda: AutoLyricsDemo._upcoming(demo)
+
+
+def track(title: str) -> SpotifyTrack:
+    return SpotifyTrack.from_item(item(title))
+
+
+def test_next_tracks_in_the_queue_are_prefetched(fetched, prefetcher):
+    titles, release = fetched
+    release.set()
+    _, queue = upcoming(StubSpotify(["One", "Two", "Three"]))
+    prefetcher.prefetch_queue(queue).result(1)
+
+    assert prefetcher.pop(track("Three")) is None
+    assert prefetcher.pop(track("One")).result(1) == ("stub", [(0.0, "One")])
+    assert prefetcher.pop(track("Two")).result(1) == ("stub", [(0.0, "Two")])
+    assert prefetcher.pop(track("One")) is None
+    assert titles == ["One", "Two"]
+
+
+def test_queue_is_read_while_fetches_are_running(fetched, prefetcher):
+    titles, release = fetched
+    prefetcher.prefetch([track("Playing")])
+    _, queue = upcoming(StubSpotify(["Next"]))
+
+    # the only fetch worker is busy, but the queue is still read straight away
+    prefetcher.prefetch_queue(queue).result(1)
+    assert prefetcher.pop(track("Next")) is not None
+    assert titles == ["Playing"]
+
+
+def test_least_recently_wanted_tracks_are_cancelled(fetched, prefetcher):
+    titles, release = fetched
+    prefetcher.prefetch([track("One"), track("Two")])
+    two = prefetcher._tracks[("Two", "Artist")]
+    prefetcher.prefetch([track("Three"), track("Four")])
+    release.set()
+
+    assert two.cancelled()
+    assert prefetcher.pop(track("One")) is None
+    assert prefetcher.pop(track("Two")) is None
+    assert prefetcher.pop(track("Three")).result(1) is not None
+    assert prefetcher.pop(track("Four")).result(1) is not None
+    assert titles == ["One", "Three", "Four"]
+
+
+def test_wanted_again_tracks_are_kept(fetched, prefetcher):
+    titles, release = fetched
+    release.set()
+    prefetcher.prefetch([track("One"), track("Two")])
+    prefetcher.prefetch([track("One"), track("Three")])
+
+    assert prefetcher.pop(track("Two")) is None
+    assert prefetcher.pop(track("One")) is not None
+    assert prefetcher.pop(track("Three")) is not None
+
+
+def test_queue_errors_stop_prefetching(fetched, prefetcher):
+    titles, _ = fetched
+    demo, queue = upcoming(StubSpotify(["One"], error=True))
+    prefetcher.prefetch_queue(queue).result(1)
+
+    assert demo._prefetch == 0
+    assert titles == []
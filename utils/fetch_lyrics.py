@@ -7,19 +7,29 @@ at commit hash b1e85508742b127e019b6f0f751dc99f4d6bddd4
 Original source was released under The Unlicense (public domain, approx. no terms)
 """
 
-import os
-import re
 import functools
 import dataclasses
 import pathlib
-from typing import Optional
+import threading
+from concurrent import futures
+from time import monotonic
+from typing import Callable, Optional
 from urllib import parse
 
-import requests
-from unidecode import unidecode
 from bs4 import BeautifulSoup
 
-SERVICES = []
+from utils import lrc
+from utils.http_client import get_client
+from utils.lyrics_cache import get_cache
+
+SERVICES = []  # in order of preference
+MAX_WORKERS = 4  # the most services to query at once
+TIMEOUT = 10  # seconds, for each service
+BUDGET = 20  # seconds, for the whole search
+FAILURE_THRESHOLD = 3  # failures in a row before a service is skipped
+COOLDOWN = 5 * 60  # seconds to skip a failing service for, before trying again
+SMOOTHING = 0.2  # how much each result moves a service's statistics
+BAND = 2  # seconds of expected time that services are kept in order within
 UA = "Mozilla/5.0 (Maemo; Linux armv7l; rv:10.0.1) Gecko/20100101 Firefox/10.0.1 Fennec/10.0.1"
 
 
@@ -36,31 +46,103 @@ class Lyrics:
     song: Song
     source: str
     lyrics: str
+    lines: Optional[list[tuple[float, str]]] = None  # see `parse_lyrics`
 
     def __repr__(self):
         return f"Lyrics({self.song}, {self.source})"
 
 
-def filter_lyrics(lyrics: str):
-    """filter lyrics with a regexp"""
-    # fix html in result
-    lyrics = lyrics.replace("<br>", "\n")
-    lyrics = lyrics.replace("<br />", "\n")
-
-    # fix curly quotes
-    lyrics = unidecode(lyrics)
-    lyrics = lyrics.replace("“", '"')
-    lyrics = lyrics.replace("”", '"')
-
-    # filter to only timestamped lines
-    lyric_pattern = re.compile(r"^\[\d{2}:\d{2}\.\d{2}].+$")
-    output = []
-    for line in lyrics.splitlines():
-        if lyric_pattern.match(line):
-            if "RentAnAdviser" not in line:
-                output.append(line)
+@dataclasses.dataclass
+class ServiceStats:
+    """
+    Rolling statistics for a service, which are used to demote services that
+    are slow to find lyrics, or failing (see `get_lyrics`). A service that
+    fails `FAILURE_THRESHOLD` times in a row "trips", and is skipped for
+    `COOLDOWN` seconds: after that, it is given one more chance, and is skipped
+    again if that fails too
+    """
 
-    return "\n".join(output)
+    name: str
+    calls: int = 0
+    errors: int = 0
+    success_rate: float = 1.0  # how often timed lyrics are found (on average)
+    latency: Optional[float] = None  # seconds per call (on average)
+    failures: int = 0  # errors in a row
+    tripped_at: Optional[float] = None
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, found: bool = False, error: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.success_rate += SMOOTHING * (found - self.success_rate)
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += SMOOTHING * (latency - self.latency)
+
+            if error:
+                self.errors += 1
+                self.failures += 1
+                if self.failures >= FAILURE_THRESHOLD:
+                    self.tripped_at = monotonic()
+            else:
+                self.failures = 0
+                self.tripped_at = None
+
+    @property
+    def available(self) -> bool:
+        """False if the service has tripped, and is still cooling down"""
+        return self.tripped_at is None or monotonic() - self.tripped_at >= COOLDOWN
+
+    @property
+    def expected_time(self) -> float:
+        """
+        The expected time spent on this service for each set of lyrics it
+        finds (0 if it hasn't been used yet)
+        """
+        if self.latency is None:
+            return 0
+        return self.latency / max(self.success_rate, 0.05)
+
+
+def service_stats() -> list[ServiceStats]:
+    """The statistics for every service, in the order they are tried"""
+    return [service.stats for service in _ranked_services()]
+
+
+def _ranked_services() -> list:
+    # services are grouped into bands of `BAND` seconds of expected time, the
+    #  quickest to find lyrics first, and kept in the order of preference in
+    #  `SERVICES` within a band (this is a stable sort) - so a service is only
+    #  demoted once it is clearly slower. Any that have started failing are
+    #  moved to the end
+    def rank(service) -> tuple[bool, int]:
+        stats = service.stats
+        return stats.failures > 0, int(stats.expected_time // BAND)
+
+    return sorted(SERVICES, key=rank)
+
+
+def filter_lyrics(lyrics: str) -> str:
+    """Tidies up lyrics, leaving only the timed lines (see `parse_lyrics`)"""
+    return format_lyrics(parse_lyrics(lyrics))
+
+
+def parse_lyrics(lyrics: str) -> list[tuple[float, str]]:
+    """Splits lyrics in LRC format into `(time, text)` pairs, in order of time"""
+    lines = lrc.iter_lines(lyrics)
+    return lrc.to_array(
+        (time, text) for time, text in lines if "RentAnAdviser" not in text
+    ).tolist()
+
+
+def format_lyrics(lines: list[tuple[float, str]]) -> str:
+    """Reverses `parse_lyrics`"""
+    return "\n".join(
+        f"[{int(time // 60):02}:{time % 60:05.2f}]{text}" for time, text in lines
+    )
 
 
 def get_lyrics(
@@ -69,51 +151,137 @@ def get_lyrics(
     duration: Optional[int] = None,
     album: Optional[str] = None,
     save: bool = True,
+    timeout: float = TIMEOUT,
+    cache: bool = True,
+    budget: float = BUDGET,
 ) -> Optional[Lyrics]:
+    """
+    Queries every service at once, returning the timed lyrics from the most
+    preferred service that has them. This returns as soon as that is known -
+    i.e. as soon as every more preferred service has failed - and any services
+    that are still running are ignored.
+
+    Services are tried in the order of preference in `SERVICES`, except that
+    any that are clearly slower to find lyrics are demoted, any that have
+    started failing are tried last, and any that keep failing are skipped for
+    a while (see `ServiceStats`)
+
+    :param save: saves the result (including finding nothing) to the cache
+    :param timeout: the longest to wait for each service, in seconds - timed
+                    from when that service starts, so a slow service doesn't
+                    use up the time of the services after it
+    :param cache: checks the cache (see `utils.lyrics_cache`) first
+    :param budget: the longest to spend on the whole search, in seconds
+    """
     song = Song(artist.strip(), title.strip(), duration=duration, album=album)
 
-    for service in SERVICES:
-        print("> trying", service.__name__.replace("_", ""))
-        result = service(song)
-        if result:
-            lyrics, url, timed = result
-            if timed:
-                print(
-                    "Fetched lyrics from", service.__name__.replace("_", ""), "-", url
-                )
-                filtered = filter_lyrics(lyrics)
-                if save and service.__name__ != "_local":
-                    save_lyrics(song, filtered)
-                return Lyrics(song, url, filtered)
-
-
-def save_lyrics(song: Song, lyrics: str):
-    filename = (
-        "".join(
-            [
-                x if x.isalnum() or x in (" ", "-") else "_"
-                for x in f"{song.name} -- {song.artist}"
-            ]
-        )
-        + ".lrc"
+    if cache:
+        cached = get_cache().get(song.artist, song.name, song.duration)
+        if cached is not None:
+            if cached.lines is None:
+                print("No lyrics (cached)")
+                return None
+            print("Fetched lyrics from cache -", cached.source)
+            return Lyrics(
+                song, cached.source, format_lyrics(cached.lines), cached.lines
+            )
+
+    executor = futures.ThreadPoolExecutor(
+        max_workers=MAX_WORKERS, thread_name_prefix="lyrics"
     )
-    os.makedirs("lyrics", exist_ok=True)
-    file = pathlib.Path("lyrics").joinpath(filename)
-    with open(file, "w", encoding="utf-8") as f:
-        f.write(lyrics)
+    # only remember that a song has no lyrics if every service gave an answer
+    complete = True
+    services = []
+    for service in _ranked_services():
+        if service.stats.available:
+            services.append(service)
+        else:
+            print("> skipping", service.stats.name, "(failing)")
+            complete = False
+
+    # when each service started (services can wait for a free worker)
+    started: dict[int, float] = {}
+
+    def query_service(index: int):
+        started[index] = monotonic()
+        return services[index](song)
+
+    queries = [executor.submit(query_service, i) for i in range(len(services))]
+    end = monotonic() + budget
+    try:
+        for index, (service, query) in enumerate(zip(services, queries)):
+            name = service.__name__.replace("_", "")
+            try:
+                result = _wait_for(query, lambda: started.get(index), timeout, end)
+            except futures.TimeoutError:
+                print("> timed out", name)
+                complete = False
+                continue
+            except Exception as e:
+                print("> failed", name, "-", e)
+                complete = False
+                continue
+
+            if result:
+                lyrics, url, timed = result
+                if timed:
+                    print("Fetched lyrics from", name, "-", url)
+                    lines = parse_lyrics(lyrics)
+                    if save and service.__name__ != "_local":
+                        get_cache().put(
+                            song.artist, song.name, song.duration, lines, url
+                        )
+                    return Lyrics(song, url, format_lyrics(lines), lines)
+
+        if save and complete:
+            get_cache().put(song.artist, song.name, song.duration, None)
+    finally:
+        # don't wait for the slower services - their results are not needed
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _wait_for(
+    query: futures.Future,
+    started: Callable[[], Optional[float]],
+    timeout: float,
+    end: float,
+):
+    """
+    Waits for a query to finish, until `timeout` seconds after it started (or
+    the overall deadline `end`, if that is sooner)
+    """
+    while True:
+        now = monotonic()
+        start = started()
+        if start is None:
+            # still waiting for a free worker - check again later
+            deadline = min(end, now + timeout)
+        else:
+            deadline = min(end, start + timeout)
+        try:
+            return query.result(timeout=max(0.0, deadline - now))
+        except futures.TimeoutError:
+            if start is not None or monotonic() >= end:
+                raise
 
 
 def lyrics_service(_func=None, *, enabled=True):
     def _decorator_lyrics_service(func):
+        stats = ServiceStats(func.__name__.replace("_", ""))
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            # try:
-            return func(*args, **kwargs)
-            # except requests.exceptions.RequestException as error:
-            #     print("%s: %s" % (func.__name__, error))
-            # except Exception as e:
-            #     raise e
-
+            start = monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                # the error is still raised, but counts against the service
+                stats.record(monotonic() - start, error=True)
+                raise
+            stats.record(monotonic() - start, found=bool(result and result[2]))
+            return result
+
+        wrapper.stats = stats
         if enabled:
             SERVICES.append(wrapper)
         return wrapper
@@ -150,7 +318,7 @@ def _lrclib(song: Song):
     else:
         query_url = f"https://lrclib.net/api/get?artist_name={song.artist}&album_name={song.album}&track_name={song.name}&duration={song.duration}"
 
-    rq = requests.get(query_url)
+    rq = get_client().get(query_url)
     if rq.status_code == 200:
         response = rq.json()
         lyrics = response.get("syncedLyrics", None)
@@ -166,7 +334,7 @@ def _megalobiz(song: Song):
             "display": "more",
         }
     )
-    search_results = requests.get(search_url)
+    search_results = get_client().get(search_url)
     soup = BeautifulSoup(search_results.text, "html.parser")
     results = soup.find(id="list_entity_container")
     if results:
@@ -181,7 +349,7 @@ def _megalobiz(song: Song):
             and song.name.replace("/", "").lower() in lower_title
         ):
             url = f"https://www.megalobiz.com{result_link['href']}"
-            possible_text = requests.get(url)
+            possible_text = get_client().get(url)
             soup = BeautifulSoup(possible_text.text, "html.parser")
 
             lrc = soup.find("div", class_="lyrics_details").span.get_text()
@@ -207,7 +375,7 @@ def _rentanadviser(song: Song):
         "https://www.rentanadviser.com/en/subtitles/subtitles4songs.aspx?%s"
         % parse.urlencode({"src": f"{song.artist} {song.name}"})
     )
-    search_results = requests.get(search_url, headers={"User-Agent": UA})
+    search_results = get_client().get(search_url, headers={"User-Agent": UA})
     soup = BeautifulSoup(search_results.text, "html.parser")
     result_links = soup.find(id="tablecontainer").find_all("a")
 
@@ -216,13 +384,13 @@ def _rentanadviser(song: Song):
             lower_title = result_link.get_text().lower()
             if song.artist.lower() in lower_title and song.name.lower() in lower_title:
                 url = f"https://www.rentanadviser.com/en/subtitles/{result_link['href']}&type=lrc"
-                possible_text = requests.get(url, headers={"User-Agent": UA})
+                possible_text = get_client().get(url, headers={"User-Agent": UA})
                 soup = BeautifulSoup(possible_text.text, "html.parser")
 
                 event_validation = soup.find(id="__EVENTVALIDATION")["value"]
                 view_state = soup.find(id="__VIEWSTATE")["value"]
 
-                lrc = requests.post(
+                lrc = get_client().post(
                     possible_text.url,
                     {
                         "__EVENTTARGET": "ctl00$ContentPlaceHolder1$btnlyrics",
@@ -241,7 +409,7 @@ def _lyricsify(song: Song):
     search_url = "https://www.lyricsify.com/search?%s" % parse.urlencode(
         {"q": f"{song.artist} {song.name}"}
     )
-    search_results = requests.get(search_url, headers={"User-Agent": UA})
+    search_results = get_client().get(search_url, headers={"User-Agent": UA})
     soup = BeautifulSoup(search_results.text, "html.parser")
 
     result_container = soup.find("div", class_="sub")
@@ -255,13 +423,14 @@ def _lyricsify(song: Song):
                 name = result_link.get_text().lower()
                 if song.artist.lower() in name and song.name.lower() in name:
                     url = f"https://www.lyricsify.com{result_link['href']}?download"
-                    lyrics_page = requests.get(url, headers={"User-Agent": UA})
+                    lyrics_page = get_client().get(url, headers={"User-Agent": UA})
                     soup = BeautifulSoup(lyrics_page.text, "html.parser")
 
                     download_link = soup.find(id="iframe_download")["src"]
-                    lrc = requests.get(
+                    download = get_client().get(
                         download_link,
                         cookies=lyrics_page.cookies,
                         headers={"User-Agent": UA},
-                    ).text
+                    )
+                    lrc = download.text
                     return lrc, lyrics_page.url, True
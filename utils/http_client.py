@@ -0,0 +1,141 @@
+"""
+A shared HTTP client for everything that fetches from the network (lyrics
+services, train times, ...). Connections are pooled and kept alive per host,
+every request has a timeout, failed requests are retried a few times, and the
+number of requests to each host at once is limited. Sessions don't keep any
+cookies, so nothing is carried from one song to the next - pass `cookies=` to
+send them with a request.
+
+Use `get_client` to get the shared client, or `set_client` to replace it - e.g.
+with one that sends requests for a host to a local stand-in server instead
+"""
+
+import random
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from time import sleep
+from typing import Optional
+from urllib import parse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_METHODS = {"GET", "HEAD"}  # requests that are safe to send twice
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    def __init__(
+        self,
+        timeout: float = 10,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_per_host: int = 4,
+        hosts: Optional[dict[str, str]] = None,
+    ):
+        """
+        :param timeout: the default timeout for each request, in seconds
+        :param retries: the most times to retry a failed request
+        :param backoff: the base delay between retries, in seconds - this
+                        doubles after each retry, and a random amount of it is
+                        used to avoid retrying in lockstep
+        :param max_per_host: the most requests to one host at once
+        :param hosts: sends requests for a host somewhere else instead, e.g.
+                      `{"lrclib.net": "http://localhost:8000"}`
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._max_per_host = max_per_host
+        self._hosts = hosts or {}
+        self._lock = threading.Lock()
+        self._sessions: dict[str, requests.Session] = {}
+        self._limits: dict[str, threading.BoundedSemaphore] = {}
+
+    def _session(self, host: str) -> tuple[requests.Session, threading.Semaphore]:
+        """The session (holding the connection pool) and limit for a host"""
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                # sessions are shared by every request to a host, so they
+                #  don't store the cookies they are sent
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self._max_per_host
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+                self._limits[host] = threading.BoundedSemaphore(self._max_per_host)
+            return self._sessions[host], self._limits[host]
+
+    def _delay(self, attempt: int) -> float:
+        return random.uniform(0, self.backoff * 2**attempt)
+
+    def _rewrite(self, url: str) -> str:
+        parts = parse.urlsplit(url)
+        if parts.netloc not in self._hosts:
+            return url
+        target = parse.urlsplit(self._hosts[parts.netloc])
+        return parse.urlunsplit(
+            parts._replace(scheme=target.scheme, netloc=target.netloc)
+        )
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request (taking the same arguments as `requests.request`).
+        Requests that are safe to repeat are retried if they fail to connect,
+        time out or get a temporary error from the server
+        """
+        url = self._rewrite(url)
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        retries = self.retries if method in RETRY_METHODS else 0
+        session, limit = self._session(parse.urlsplit(url).netloc)
+
+        for attempt in range(retries + 1):
+            try:
+                with limit:
+                    response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == retries:
+                    return response
+                response.close()
+            sleep(self._delay(attempt))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, data=None, **kwargs) -> requests.Response:
+        return self.request("POST", url, data=data, **kwargs)
+
+    def close(self):
+        """Closes every pooled connection"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._limits.clear()
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """The shared client, which is created the first time it is needed"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def set_client(client: Optional[HttpClient]):
+    """Replaces the shared client (or resets it to the default, with `None`)"""
+    global _client
+    with _client_lock:
+        _client = client
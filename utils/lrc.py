@@ -0,0 +1,96 @@
+"""
+A parser for LRC files (timed lyrics), as returned by the lyrics services.
+The whole file is handled in one pass, a line at a time:
+
+    [ti:Title]                  tags are skipped (except `offset`)
+    [offset:+500]               shifts every following line earlier by 500ms
+    [00:12.34]A line            times can be [mm:ss], [mm:ss.x] to [mm:ss.xxx]
+    [00:15.00][01:15.00]Chorus  a line can be shown at several times
+    [00:20.00]<00:20.00>Word <00:20.50>timing  word times are removed
+
+Some services put several lines on one line, separated by `<br>`, so these are
+split up too
+"""
+
+import re
+from typing import Iterable, Iterator, Union
+
+import numpy as np
+
+_LINE = re.compile(r"[^\r\n]+")
+_BREAK = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_TIMESTAMP = re.compile(r"\[(\d+):(\d{1,2}(?:[.:]\d{1,3})?)]")
+_TAG = re.compile(r"\[([a-z#]+):([^]]*)]", re.IGNORECASE)
+_WORD_TIMESTAMP = re.compile(r"<\d+:\d{1,2}(?:[.:]\d{1,3})?>")
+
+# anything else outside of ASCII is transliterated as it is rendered, see
+#  `flippy.text_rendering.FontStack`
+_QUOTES = str.maketrans({"“": '"', "”": '"'})
+
+
+def _split(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    """The lines of a file, without copying the whole of it"""
+    lines = (
+        (m.group() for m in _LINE.finditer(source))
+        if isinstance(source, str)
+        else source
+    )
+    for line in lines:
+        if "<" in line:
+            yield from _BREAK.split(line)
+        else:
+            yield line
+
+
+def iter_lines(source: Union[str, Iterable[str]]) -> Iterator[tuple[float, str]]:
+    """
+    Yields the `(time, text)` pairs in an LRC file, in the order they are
+    written - a line with several times is yielded once for each time
+
+    :param source: the contents of the file, or its lines (e.g. the file
+                   itself)
+    """
+    offset = 0.0
+    for line in _split(source):
+        line = line.strip()
+        times = []
+        position = 0
+        while match := _TIMESTAMP.match(line, position):
+            minutes, seconds = match.groups()
+            times.append(int(minutes) * 60 + float(seconds.replace(":", ".")))
+            position = match.end()
+
+        if not times:
+            tag = _TAG.fullmatch(line)
+            if tag and tag.group(1).lower() == "offset":
+                try:
+                    # a positive offset shows the lyrics sooner
+                    offset = int(tag.group(2).strip()) / 1000
+                except ValueError:
+                    pass
+            continue
+
+        text = line[position:]
+        if "<" in text:
+            text = _WORD_TIMESTAMP.sub("", text)
+        text = text.translate(_QUOTES).strip()
+        if text:
+            for time in times:
+                yield max(0.0, time - offset), text
+
+
+def to_array(lines: Iterable[tuple[float, str]]) -> np.ndarray:
+    """
+    Collects timed lines into a structured array with `time` and `text`
+    fields, sorted by time (lines at the same time stay in order). Use
+    `.tolist()` to get back a list of `(time, text)` pairs
+    """
+    lines = list(lines)
+    width = max((len(text) for _, text in lines), default=1)
+    array = np.array(lines, dtype=[("time", "<f8"), ("text", f"<U{width}")])
+    return array[np.argsort(array["time"], kind="stable")]
+
+
+def parse(source: Union[str, Iterable[str]]) -> np.ndarray:
+    """Parses an LRC file into a sorted array (see `iter_lines` and `to_array`)"""
+    return to_array(iter_lines(source))
@@ -0,0 +1,194 @@
+"""
+An on-disk cache of lyrics, stored in an SQLite database in the `lyrics/`
+directory. Songs are looked up by their normalised artist, title and duration,
+so small differences in metadata (e.g. "(Remastered 2011)", or a duration that
+is a second out) still find the same lyrics.
+
+Songs that have no lyrics are cached too (for `NEGATIVE_TTL` seconds), so they
+are not searched for again every time they are played. Writes are made by a
+background thread, so they never hold up playback
+"""
+
+import atexit
+import contextlib
+import json
+import logging
+import pathlib
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from queue import Queue
+from typing import Optional
+
+from unidecode import unidecode
+
+DEFAULT_PATH = pathlib.Path("lyrics").joinpath("cache.sqlite3")
+NEGATIVE_TTL = 24 * 60 * 60  # seconds
+DURATION_TOLERANCE = 2  # seconds either side of the duration that still match
+UNKNOWN_DURATION = -1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lyrics (
+    artist TEXT NOT NULL,
+    title TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    lines TEXT,  -- a JSON list of [time, text] pairs, or NULL for no lyrics
+    source TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (artist, title, duration)
+) WITHOUT ROWID
+"""
+
+
+@dataclass
+class CachedLyrics:
+    lines: Optional[list[tuple[float, str]]]  # `None` if there are no lyrics
+    source: Optional[str]
+    fetched_at: float
+
+
+def normalise(text: str, artist: bool = False) -> str:
+    """
+    Reduces an artist or title to a form that ignores small differences in
+    metadata: case, accents, punctuation, and anything in brackets or after a
+    " - " (which tends to be "Remastered", "Live" etc.)
+    """
+    text = unidecode(text).lower()
+    text = re.sub(r"\(.*?\)|\[.*?]", "", text)
+    text = re.sub(r"\s+-\s+.*", "", text)
+    text = re.sub(r"\b(feat|ft)\b.*", "", text)
+    text = re.sub(r"[^a-z0-9]+", " ", text).strip()
+    if artist:
+        text = re.sub(r"^the ", "", text)
+    return text
+
+
+class LyricsCache:
+    def __init__(self, path: pathlib.Path | str = DEFAULT_PATH):
+        self._path = pathlib.Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._logger = logging.getLogger("LyricsCache")
+
+        # the table is created up front, so that reads never have to wait
+        with contextlib.closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_SCHEMA)
+
+        self._writes: Queue = Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, daemon=True, name="lyrics-cache"
+        )
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=10)
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """A connection for the current thread (connections can't be shared)"""
+        if not hasattr(self._local, "connection"):
+            self._local.connection = self._connect()
+        return self._local.connection
+
+    def get(
+        self, artist: str, title: str, duration: Optional[int] = None
+    ) -> Optional[CachedLyrics]:
+        """
+        Looks up a song, returning `None` if it is not in the cache (or if it
+        was cached as having no lyrics, and that has expired)
+        """
+        query = (
+            "SELECT lines, source, fetched_at FROM lyrics"
+            " WHERE artist = ? AND title = ?"
+        )
+        parameters = [normalise(artist, artist=True), normalise(title)]
+        if duration is not None:
+            # prefer the closest duration, but accept entries without one
+            query += (
+                " AND (duration BETWEEN ? AND ? OR duration = ?)"
+                " ORDER BY duration = ?, abs(duration - ?)"
+            )
+            parameters += [
+                duration - DURATION_TOLERANCE,
+                duration + DURATION_TOLERANCE,
+                UNKNOWN_DURATION,
+                UNKNOWN_DURATION,
+                duration,
+            ]
+        query += " LIMIT 1"
+
+        row = self._connection.execute(query, parameters).fetchone()
+        if row is None:
+            return None
+
+        lines, source, fetched_at = row
+        if lines is None:
+            if time.time() - fetched_at > NEGATIVE_TTL:
+                return None
+            return CachedLyrics(None, source, fetched_at)
+        return CachedLyrics(
+            [(time_, text) for time_, text in json.loads(lines)], source, fetched_at
+        )
+
+    def put(
+        self,
+        artist: str,
+        title: str,
+        duration: Optional[int],
+        lines: Optional[list[tuple[float, str]]],
+        source: Optional[str] = None,
+    ):
+        """
+        Stores the lyrics for a song, or records that it has none (if `lines`
+        is `None`). This returns straight away, and the write happens later
+        """
+        self._writes.put(
+            (
+                normalise(artist, artist=True),
+                normalise(title),
+                UNKNOWN_DURATION if duration is None else duration,
+                None if lines is None else json.dumps(lines),
+                source,
+                time.time(),
+            )
+        )
+
+    def flush(self):
+        """Waits for every pending write to be made"""
+        self._writes.join()
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            # write everything that is waiting in one transaction
+            rows = [self._writes.get()]
+            while not self._writes.empty():
+                rows.append(self._writes.get())
+            try:
+                with connection:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO lyrics VALUES (?, ?, ?, ?, ?, ?)", rows
+                    )
+            except sqlite3.Error:
+                self._logger.exception("Failed to cache lyrics")
+            finally:
+                for _ in rows:
+                    self._writes.task_done()
+
+
+_cache: Optional[LyricsCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LyricsCache:
+    """The shared cache, which is opened the first time it is needed"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LyricsCache()
+            # make sure anything waiting to be written is saved before exiting
+            atexit.register(_cache.flush)
+        return _cache
@@ -1,3 +1,4 @@
+from bisect import bisect_right
 from dataclasses import dataclass, field
 from time import monotonic
 from typing import Optional
@@ -6,6 +7,8 @@ import numpy as np
 import blessed
 
 from flippy.sign import Sign
+from flippy.transitions import frame_at
+from utils.prepare import show
 
 
 @dataclass
@@ -14,12 +17,94 @@ class Track:
     artist: str = ""
     lyrics: list[tuple[float, str]] = field(default_factory=list)
     screens: list[tuple[float, np.ndarray]] = field(default_factory=list)
+    transitions: list[Optional[np.ndarray]] = field(default_factory=list)
+    packets: dict[bytes, bytes] = field(default_factory=dict)  # see `Preparer`
+
+
+class TerminalView:
+    """
+    A fixed number of lines on the terminal, starting at the cursor. It keeps
+    track of what is already on screen, and only writes the parts of lines
+    that have changed - so redrawing many times a second stays cheap, even over
+    a slow connection
+
+    A line is either a string, or a tuple of cells (strings). Cells are compared
+    in order, so a cell is only rewritten if it or a cell before it changed
+    """
+
+    def __init__(self, term: blessed.Terminal, height: int):
+        self._term = term
+        self._height = height
+        self._lines: list[tuple[str, ...]] = [()] * height
+        self._width = term.width
+
+        # make room for the lines, and go back to the first one
+        if height > 1:
+            print("\n" * (height - 1) + term.move_up(height - 1), end="")
+
+    def invalidate(self):
+        """Forgets what is on screen, so everything is redrawn next time"""
+        self._lines = [()] * self._height
+
+    def _move(self, row: int, to: int) -> str:
+        if to > row:
+            return self._term.move_down(to - row)
+        if to < row:
+            return self._term.move_up(row - to)
+        return ""
+
+    def draw(self, lines: list):
+        """Updates the lines on screen (missing lines are left blank)"""
+        if self._term.width != self._width:
+            # lines will have been re-wrapped by the terminal
+            self._width = self._term.width
+            self.invalidate()
+
+        lines = list(lines[: self._height])
+        lines += [""] * (self._height - len(lines))
+
+        output = []
+        row = 0
+        for i, line in enumerate(lines):
+            cells = (line,) if isinstance(line, str) else tuple(line)
+            previous = self._lines[i]
+            if cells == previous:
+                continue
+
+            # skip past the cells that are already on screen
+            unchanged = 0
+            while (
+                unchanged < min(len(cells), len(previous))
+                and cells[unchanged] == previous[unchanged]
+            ):
+                unchanged += 1
+            column = sum(self._term.length(cell) for cell in cells[:unchanged])
+
+            output.append(self._move(row, i))
+            output.append(self._term.move_x(column) if column else "\r")
+            # don't reach the last column, or the terminal may wrap the line
+            text = "".join(cells[unchanged:])
+            output.append(self._term.truncate(text, max(0, self._width - 1 - column)))
+            output.append(self._term.clear_eol)
+            self._lines[i] = cells
+            row = i
+
+        if output:
+            output.append(self._move(row, 0))
+            print("".join(output), end="", flush=True)
 
 
 class LyricsGui:
     def __init__(self, track: Optional[Track]):
         self.term = blessed.Terminal()
         self._track = track
+        self._view: Optional[TerminalView] = None
+
+        # the time of each lyric, for finding the current one, and the lyrics
+        #  they came from (so they are only worked out when the lyrics change)
+        self._times: list[float] = []
+        self._times_of: Optional[list] = None
+        self._cursor = -1
 
     @property
     def track(self):
@@ -29,7 +114,8 @@ class LyricsGui:
     def track(self, value):
         self._track = value
 
-    def progress(self, time):
+    def progress(self, time) -> tuple[str, str]:
+        """the progress bar and the time, as separate cells (see `TerminalView`)"""
         end_time = self._track.lyrics[-1][0] + 5
         percentage = min(1, time / end_time)
         width = self.term.width
@@ -40,26 +126,42 @@ class LyricsGui:
             progress_part = "█" * int(blocks) + "▌" + " " * (width - int(blocks) - 1)
         else:
             progress_part = "█" * int(blocks) + " " * (width - int(blocks))
-        return f"{progress_part} [{time_part}]"
-
-    def get_index(self, time: float, last_index: Optional[int] = -1) -> int:
-        """returns the most recent lyric (the lyric with the largest time that is *not* larger than the current time"""
-        if last_index is not None and last_index >= 0:
-            candidates = self._track.lyrics[last_index + 1 :]
+        return progress_part, f" [{time_part}]"
+
+    def _lyric_times(self) -> list[float]:
+        lyrics = self._track.lyrics
+        if lyrics is not self._times_of:
+            self._times = [t for t, _ in lyrics]  # lyrics are in order
+            self._times_of = lyrics
+            self._cursor = -1
+        return self._times
+
+    def get_index(self, time: float, last_index: Optional[int] = None) -> int:
+        """
+        returns the most recent lyric (the lyric with the largest time that is *not* larger than the current time)
+
+        :param last_index: the index returned last time, if known - otherwise the last index this found is used
+        """
+        times = self._lyric_times()
+        if time > times[-1] + 5:
+            return len(times)
+
+        index = self._cursor if last_index is None else last_index
+        # during playback, the lyric is usually the same as last time or the
+        #  next one, so check those before searching (e.g. after skipping)
+        for step in (0, 1):
+            i = index + step
+            if (
+                -1 <= i < len(times)
+                and (i < 0 or times[i] <= time)
+                and (i + 1 == len(times) or time < times[i + 1])
+            ):
+                break
         else:
-            candidates = self._track.lyrics
-            last_index = -1
-
-        for i, (t, _) in enumerate(candidates):
-            if t <= time and i != len(candidates):
-                last_index += 1
-            else:
-                return last_index
+            i = bisect_right(times, time) - 1
 
-        if time > self._track.lyrics[-1][0] + 5:
-            return len(self._track.lyrics)
-
-        return len(self._track.lyrics) - 1
+        self._cursor = i
+        return i
 
     def lyrics(self, index: int):
         def _safe_get(i):
@@ -71,37 +173,35 @@ class LyricsGui:
             return [None, None, None]
         return [_safe_get(index - 1), _safe_get(index), _safe_get(index + 1)]
 
-    def show(self, time: float, last_index: Optional[int] = None):
-        if self.track is None:
-            raise ValueError()
-
-        # reset
-        print(self.progress(time))
-
+    def rows(self, time: float, last_index: Optional[int] = None) -> tuple[int, list]:
+        """the index of the current lyric, and the lines to show (see `TerminalView`)"""
         index = self.get_index(time, last_index)
-        lyrics = self.lyrics(index)
-        for i, pair in enumerate(lyrics):
+        rows = [self.progress(time)]
+        for i, pair in enumerate(self.lyrics(index)):
             if pair:
                 t, line = pair
-                if i == 1:
-                    print(
-                        f"{self.term.clear_eol}{self.term.white}[{t:.1f}]: {line}{self.term.normal}"
-                    )
-                else:
-                    print(
-                        f"{self.term.clear_eol}{self.term.red}[{t:.1f}]: {line}{self.term.normal}"
-                    )
+                colour = self.term.white if i == 1 else self.term.red
+                rows.append(f"{colour}[{t:.1f}]: {line}{self.term.normal}")
             else:
-                print(self.term.clear_eol)
+                rows.append("")
+        return index, rows
+
+    def show(self, time: float, last_index: Optional[int] = None):
+        if self.track is None:
+            raise ValueError()
+
+        if self._view is None:
+            self._view = TerminalView(self.term, 4)
+        index, rows = self.rows(time, last_index)
+        self._view.draw(rows)
         return index
 
     def loop(self, driver: Optional[Sign] = None):
         if self.track is None:
             raise ValueError()
 
-        print(
-            f"{self.term.blue}Now Playing: {self._track.name}{self.term.normal}\n\n\n\n"
-        )
+        print(f"{self.term.blue}Now Playing: {self._track.name}{self.term.normal}")
+        self._view = TerminalView(self.term, 4)
         end_time = self._track.lyrics[-1][0] + 5
         start_time = monotonic()
         with self.term.cbreak(), self.term.hidden_cursor():
@@ -109,14 +209,15 @@ class LyricsGui:
                 index = -1
                 while (delta := (monotonic() - start_time)) < end_time:
                     # show interface
-                    print(self.term.move_up(4), end="")
                     index = self.show(delta, index)
 
                     # physical sign
                     if driver is not None and 0 <= index < len(self._track.screens):
                         # because the driver does efficient updates, this won't try and write to the sign every tick
-                        driver.state = self._track.screens[index][1]
-                        driver.update()
+                        frame = frame_at(
+                            self._track.screens, self._track.transitions, index, delta
+                        )
+                        show(driver, frame, self._track.packets)
 
                     # controls - allow for skipping forwards/backwards
                     key = self.term.inkey(timeout=0.05)
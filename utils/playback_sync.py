@@ -0,0 +1,109 @@
+"""
+Keeps track of where playback is in the current track, from occasional polls
+of a "currently playing" endpoint (e.g. Spotify's).
+
+Each poll gives the progress through the track at some point during the
+request, so the time the track started is estimated from the middle of the
+request, and a median of the recent estimates is used - so one slow response
+doesn't move the lyrics. The time until the next poll adapts to what is
+happening: polls are rare in the middle of a track, and frequent near the end
+of a track or just after a seek or pause
+"""
+
+import statistics
+from collections import deque
+from time import monotonic
+from typing import Callable, Optional
+
+MIN_INTERVAL = 1  # seconds between polls, while things are changing
+MAX_INTERVAL = 10  # seconds between polls, in the middle of a track
+PAUSED_INTERVAL = 3  # seconds between polls, once paused for a while
+IDLE_INTERVAL = 5  # seconds between polls, when nothing is playing
+SEEK_THRESHOLD = 1  # seconds that an estimate can be out before it is a seek
+END_MARGIN = 0.5  # seconds after a track should end to poll for the next one
+WINDOW = 5  # the number of estimates the median is taken over
+SETTLE = 3  # polls to make quickly after a change, before slowing down
+
+
+class PlaybackSync:
+    def __init__(self, fetch: Callable[[], Optional[dict]], window: int = WINDOW):
+        """
+        :param fetch: returns what is currently playing, in the format of
+                      Spotify's currently playing endpoint (or `None`)
+        :param window: the number of polls to smooth over
+        """
+        self._fetch = fetch
+        self._starts: deque[float] = deque(maxlen=window)
+        self._round_trips: deque[float] = deque(maxlen=window)
+        self._item: Optional[str] = None
+        self._playing = False
+        self._progress: Optional[float] = None
+        self._duration: Optional[float] = None
+        self._start_time: Optional[float] = None
+        self._polls = 0
+
+    @property
+    def start_time(self) -> Optional[float]:
+        """The `monotonic()` time at which the track started (if playing)"""
+        return self._start_time
+
+    @property
+    def round_trip(self) -> Optional[float]:
+        """The typical time a poll takes, in seconds"""
+        if not self._round_trips:
+            return None
+        return statistics.median(self._round_trips)
+
+    @property
+    def polls(self) -> int:
+        return self._polls
+
+    def poll(self) -> Optional[dict]:
+        """Asks what is playing, and updates the estimates from the answer"""
+        sent = monotonic()
+        track = self._fetch()
+        received = monotonic()
+        self._polls += 1
+        self._round_trips.append(received - sent)
+
+        if not track or not track.get("item"):
+            self._item, self._start_time = None, None
+            self._starts.clear()
+            return track
+
+        item = track["item"]
+        key = item.get("uri") or item["name"]
+        playing = track["is_playing"]
+        progress = track["progress_ms"] / 1000
+        # the progress was read at some point during the request - halfway
+        #  through is the best guess
+        start = (sent + received) / 2 - progress
+
+        if key != self._item or playing != self._playing:
+            changed = True  # a new track, or paused / resumed
+        elif playing:
+            changed = abs(start - self._start_time) > SEEK_THRESHOLD
+        else:
+            changed = progress != self._progress  # seeking while paused
+        if changed:
+            # the old estimates no longer apply
+            self._starts.clear()
+
+        self._starts.append(start)
+        self._item, self._playing = key, playing
+        self._progress, self._duration = progress, item["duration_ms"] / 1000
+        self._start_time = statistics.median(self._starts)
+        return track
+
+    def interval(self) -> float:
+        """How long to wait before polling again"""
+        if self._item is None:
+            return IDLE_INTERVAL
+        if len(self._starts) < SETTLE:
+            return MIN_INTERVAL  # something has just changed
+        if not self._playing:
+            return PAUSED_INTERVAL
+
+        # poll just after the track should end, to pick up the next one
+        remaining = self._duration - (monotonic() - self._start_time)
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, remaining + END_MARGIN))
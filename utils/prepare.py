@@ -0,0 +1,237 @@
+"""
+Prepares whole tracks for playback ahead of time: every screen of lyrics is
+rendered, every transition between screens is generated, and every frame is
+packed and encoded into the packet that is sent to the sign. Playback is then
+nothing but writing packets (see `show`).
+
+Tracks are prepared in a pool of worker threads, and the rendered frames are
+saved to disk - keyed by the lyrics, font and sign - so a song that has been
+played before is ready straight away
+"""
+
+import hashlib
+import json
+import pathlib
+import tempfile
+from concurrent import futures
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from flippy.comms import pack_image
+from flippy.sign import Sign
+from flippy.text_rendering import TextLayout, TextRenderer
+from flippy.transitions import Transition, precompute
+
+DEFAULT_DIRECTORY = pathlib.Path("lyrics").joinpath("prepared")
+FORMAT_VERSION = 1  # change this if the way screens are laid out changes
+
+
+@dataclass
+class PreparedTrack:
+    lyrics: list[tuple[float, str]]  # the text of each screen
+    screens: list[tuple[float, np.ndarray]]  # packed frames (see `pack_image`)
+    transitions: list[Optional[np.ndarray]]  # stacks of packed frames
+    packets: dict[bytes, bytes]  # packed frame -> encoded packet
+
+
+def split_into_screens(
+    renderer: TextRenderer, lyrics: list[tuple[float, str]], blank: bool = True
+) -> tuple[list[tuple[float, Optional[np.ndarray]]], list[tuple[float, str]]]:
+    """
+    Renders timed lyrics onto as many screens as they need, returning the timed
+    screens (`None` for a blank screen) and the text on each of them
+
+    :param blank: adds a blank screen during long gaps between lyrics
+    """
+    timed_screens = []
+    timed_lyrics = []
+
+    # render every screen of the song in one go, balancing the words across
+    #  screens so that we don't waste time flipping to a near-empty screen
+    screens, screen_texts = renderer.batch_text(
+        [line for _, line in lyrics], layout=TextLayout.OPTIMAL
+    )
+    screen_counts = np.bincount(
+        [index for index, _ in screen_texts], minlength=len(lyrics)
+    )
+
+    screen_index = 0
+    for i, (t, line) in enumerate(lyrics):
+        if i + 1 != len(lyrics):
+            next_t = lyrics[i + 1][0]
+        else:
+            next_t = t + 5
+
+        for j in range(screen_counts[i]):
+            screen_time = t + min(5, next_t - t) * (j / screen_counts[i])
+            timed_screens.append((screen_time, screens[screen_index]))
+            timed_lyrics.append((screen_time, screen_texts[screen_index][1]))
+            screen_index += 1
+
+        if blank and next_t - t > 10:
+            timed_screens.append((t + 6, None))
+            timed_lyrics.append((t + 6, "♫"))
+
+    return timed_screens, timed_lyrics
+
+
+def show(sign: Sign, frame: np.ndarray, packets: dict[bytes, bytes]):
+    """Writes a prepared frame to the sign, using its prepared packet"""
+    sign.update_packed(frame, packet=packets.get(frame.tobytes()))
+
+
+class Preparer:
+    def __init__(
+        self,
+        sign: Sign,
+        renderer: TextRenderer,
+        transition: Transition = Transition.SCROLL,
+        workers: int = 2,
+        directory: Optional[pathlib.Path] = DEFAULT_DIRECTORY,
+        duration: float = 1,
+    ):
+        """
+        :param sign: the sign that the tracks are shown on
+        :param renderer: the renderer for the lyrics
+        :param transition: the transition between screens - it is given as
+                           many frames as the link to the sign can keep up with
+        :param workers: the number of tracks to prepare at once
+        :param directory: where to save the rendered frames (or `None` to not
+                          save them)
+        :param duration: the time each transition is played over (see
+                         `frame_at`)
+        """
+        self._sign = sign
+        self._renderer = renderer
+        self._transition = transition
+        self._duration = duration
+        self._directory = directory
+        self._pool = futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="prepare"
+        )
+
+    def submit(self, lyrics: list[tuple[float, str]]) -> futures.Future:
+        """Starts preparing a track in the background"""
+        return self._pool.submit(self.prepare, lyrics)
+
+    def prepare(self, lyrics: list[tuple[float, str]]) -> PreparedTrack:
+        """Prepares a track (on the calling thread)"""
+        path = self._path(lyrics)
+        frames = None
+        if path is not None and path.exists():
+            try:
+                frames = self._load(path)
+            except (OSError, ValueError, KeyError):
+                frames = None
+
+        if frames is None:
+            frames = self._render(lyrics)
+            if path is not None and frames[1]:
+                self._save(path, *frames)
+
+        timed_lyrics, screens, transitions = frames
+        packets = {}
+        for frame in [frame for _, frame in screens] + [
+            frame for stack in transitions if stack is not None for frame in stack
+        ]:
+            key = frame.tobytes()
+            if key not in packets:
+                packets[key] = self._sign.encode(frame)
+
+        return PreparedTrack(timed_lyrics, screens, transitions, packets)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _path(self, lyrics: list[tuple[float, str]]) -> Optional[pathlib.Path]:
+        if self._directory is None:
+            return None
+        key = hashlib.sha1(json.dumps(lyrics).encode())
+        key.update(self._renderer.font.fingerprint.encode())
+        key.update(
+            repr(
+                (
+                    FORMAT_VERSION,
+                    self._sign.shape,
+                    self._transition.name,
+                    self._duration,
+                    self._sign.comms.BAUDRATE,
+                )
+            ).encode()
+        )
+        return self._directory.joinpath(f"{key.hexdigest()}.npz")
+
+    def _render(self, lyrics: list[tuple[float, str]]):
+        screens, timed_lyrics = split_into_screens(self._renderer, lyrics)
+        if not screens:
+            return timed_lyrics, [], []
+
+        # blank screens are shown as empty frames, so they can be prepared too
+        blank = np.zeros(self._sign.shape, dtype=bool)
+        frames = [blank if screen is None else screen for _, screen in screens]
+        transitions = precompute(frames, self._transition, self._steps(screens))
+
+        packed_screens = [
+            (t, frame) for (t, _), frame in zip(screens, pack_image(np.array(frames)))
+        ]
+        packed_transitions = [
+            None if stack is None else pack_image(stack) for stack in transitions
+        ]
+        return timed_lyrics, packed_screens, packed_transitions
+
+    def _steps(self, screens: list[tuple[float, Optional[np.ndarray]]]) -> list[int]:
+        """
+        The number of frames each transition can have, so that every frame is
+        written to the sign before the next one is due (the transitions
+        between screens that are close together are shorter, see `frame_at`)
+        """
+        blank = pack_image(np.zeros(self._sign.shape, dtype=bool))
+        frame_time = self._sign.comms.write_time(self._sign.encode(blank))
+        steps = []
+        for (t, _), (next_t, _) in zip(screens, screens[1:]):
+            duration = min(self._duration, (next_t - t) / 2)
+            steps.append(max(0, int(duration / frame_time)))
+        return steps
+
+    def _save(self, path: pathlib.Path, timed_lyrics, screens, transitions):
+        # transitions are stored back to back, with the length of each one
+        lengths = [-1 if stack is None else len(stack) for stack in transitions]
+        stacks = [stack for stack in transitions if stack is not None]
+        width, bytes_per_column = screens[0][1].shape
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # each save gets its own temporary file, so two workers preparing the
+        #  same lyrics can't replace the file with one that is half written
+        with tempfile.NamedTemporaryFile(
+            dir=path.parent, prefix=path.stem, suffix=".tmp", delete=False
+        ) as file:
+            np.savez(
+                file,
+                lyrics=np.array(json.dumps(timed_lyrics)),
+                times=np.array([t for t, _ in screens], dtype=float),
+                screens=np.array([frame for _, frame in screens]),
+                lengths=np.array(lengths, dtype=np.int64),
+                transitions=(
+                    np.concatenate(stacks)
+                    if stacks
+                    else np.zeros((0, width, bytes_per_column), dtype=np.uint8)
+                ),
+            )
+        pathlib.Path(file.name).replace(path)
+
+    @staticmethod
+    def _load(path: pathlib.Path):
+        with np.load(path) as data:
+            timed_lyrics = [(t, text) for t, text in json.loads(str(data["lyrics"]))]
+            screens = list(zip(data["times"].tolist(), data["screens"]))
+            stacks = data["transitions"]
+            transitions = []
+            start = 0
+            for length in data["lengths"].tolist():
+                if length < 0:
+                    transitions.append(None)
+                else:
+                    transitions.append(stacks[start : start + length])
+                    start += length
+        return timed_lyrics, screens, transitions